@@ -1,7 +1,10 @@
-import sqlite3, os, sys, time
+import os, sys, time, json
 from datetime import datetime, timedelta
 import tweepy
 from dotenv import load_dotenv
+import storage, rollups, metrics
+from learner import BanditLearner
+from ratelimit import RateLimitGovernor, GET_TWEETS
 
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -9,23 +12,51 @@ if sys.platform == 'win32':
 load_dotenv()
 
 class Analytics:
+    BATCH_SIZE = 100  # max ids per get_tweets call
+    
     def __init__(self):
-        self.db = sqlite3.connect('bot.db')
+        self.db = storage.connect()
+        self.learner = BanditLearner(self.db)
         self.client = tweepy.Client(bearer_token=os.getenv('X_BEARER_TOKEN'))
+        self.governor = RateLimitGovernor(storage.DB_PATH)
+        self.governor.attach(self.client.session)
+    
+    @staticmethod
+    def _refresh_due(posted_ts, checked_at, now):
+        """Young posts refresh often, older ones less: every quarter of the post's age, 15 min to 24 h"""
+        if not checked_at:
+            return True
+        age = now - posted_ts
+        interval = min(max(age / 4, 900), 86400)
+        return now - checked_at >= interval
     
     def fetch_metrics(self):
-        cutoff = datetime.now() - timedelta(days=7)
-        posts = self.db.execute(
-            'SELECT tweet_id FROM posts WHERE posted_at > ? AND impressions = 0',
-            (cutoff,)
-        ).fetchall()
+        with metrics.timer('analytics_seconds', stage='fetch_metrics'):
+            self._fetch_metrics()
+    
+    def _fetch_metrics(self):
+        now = time.time()
+        posts = self.db.execute('''
+            SELECT tweet_id, posted_ts, metrics_checked_at, content_type, caption_type, posted_hour,
+                   impressions, likes, retweets, replies, engagement_rate, hashtag_set, learned_reward
+            FROM posts WHERE posted_ts > ? AND tweet_id IS NOT NULL
+        ''', (int(now) - 7 * 86400,)).fetchall()
+        previous = {p[0]: p for p in posts}
+        due = [p[0] for p in posts if self._refresh_due(p[1], p[2], now)]
         
-        updated = 0
-        for (tweet_id,) in posts:
+        rows, missing = [], []
+        for i in range(0, len(due), self.BATCH_SIZE):
+            batch = due[i:i + self.BATCH_SIZE]
+            self.governor.acquire(GET_TWEETS)
             try:
-                tweet = self.client.get_tweet(tweet_id, tweet_fields=['public_metrics'])
-                m = tweet.data.public_metrics
-                
+                with metrics.timer('analytics_seconds', stage='get_tweets'):
+                    response = self.client.get_tweets(batch, tweet_fields=['public_metrics'])
+            except Exception as e:
+                print(f"❌ Batch of {len(batch)}: {e}")
+                continue
+            
+            for tweet in response.data or []:
+                m = tweet.public_metrics
                 impressions = m.get('impression_count', 0)
                 likes = m['like_count']
                 retweets = m['retweet_count']
@@ -33,33 +64,49 @@ class Analytics:
                 
                 engagement = likes + retweets + replies
                 eng_rate = (engagement / impressions * 100) if impressions > 0 else 0
-                
-                self.db.execute('''UPDATE posts SET 
-                    impressions=?, likes=?, retweets=?, replies=?, engagement_rate=?
-                    WHERE tweet_id=?''',
-                    (impressions, likes, retweets, replies, eng_rate, tweet_id))
-                
-                updated += 1
-                print(f"✅ {tweet_id}: {impressions:,} views | {likes} ❤️ | {eng_rate:.2f}%")
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"❌ {tweet_id}: {e}")
+                reward = BanditLearner.reward(impressions, eng_rate)
+                rows.append((impressions, likes, retweets, replies, eng_rate, reward, now, str(tweet.id)))
+                print(f"✅ {tweet.id}: {impressions:,} views | {likes} ❤️ | {eng_rate:.2f}%")
+            
+            for error in response.errors or []:
+                # Deleted/protected tweets: back off like any other checked post
+                missing.append((now, error.get('resource_id')))
+                print(f"❌ {error.get('resource_id', '?')}: {error.get('detail', error.get('title'))}")
+        
+        with self.db:
+            self.db.executemany('''UPDATE posts SET 
+                impressions=?, likes=?, retweets=?, replies=?, engagement_rate=?, learned_reward=?, metrics_checked_at=?
+                WHERE tweet_id=?''', rows)
+            self.db.executemany('UPDATE posts SET metrics_checked_at=? WHERE tweet_id=?', missing)
+            for row in rows:
+                p = previous[row[-1]]
+                rollups.record_metrics(self.db, (p[3], p[4], p[5], p[1]), p[6:11], row[:5])
+                attrs = {'hour': p[5], 'content_type': p[3], 'caption_type': p[4], 'hashtag_set': p[11]}
+                self.learner.observe(attrs, p[12], row[5])
         
-        self.db.commit()
-        print(f"\n✅ Updated {updated} posts\n")
+        calls = (len(due) + self.BATCH_SIZE - 1) // self.BATCH_SIZE
+        metrics.inc('analytics_posts_updated_total', len(rows))
+        metrics.inc('analytics_posts_missing_total', len(missing))
+        print(f"\n✅ Updated {len(rows)}/{len(due)} due posts ({len(posts)} in window) with {calls} API calls\n")
     
     def show_report(self):
+        with metrics.timer('analytics_seconds', stage='show_report'):
+            self._show_report()
+    
+    def _show_report(self):
         print("="*70)
         print("🚀 JVW VIRAL GROWTH REPORT")
         print("="*70)
         
+        cutoff = int(time.time()) - 7 * 86400
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+        
         # Overall
-        total = self.db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
-        total_views = self.db.execute('SELECT SUM(impressions) FROM posts').fetchone()[0] or 0
-        total_likes = self.db.execute('SELECT SUM(likes) FROM posts').fetchone()[0] or 0
-        total_rt = self.db.execute('SELECT SUM(retweets) FROM posts').fetchone()[0] or 0
-        avg_eng = self.db.execute('SELECT AVG(engagement_rate) FROM posts WHERE impressions > 0').fetchone()[0] or 0
+        total, total_views, total_likes, total_rt, eng_sum, measured = self.db.execute('''
+            SELECT posts, impressions, likes, retweets, eng_sum, measured FROM rollups WHERE dim = 'total'
+        ''').fetchone() or (0, 0, 0, 0, 0, 0)
+        avg_eng = eng_sum / measured if measured else 0
         
         print(f"\n📊 OVERALL STATS")
         print(f"Total posts: {total}")
@@ -73,58 +120,46 @@ class Analytics:
         print(f"\n🔥 TOP 5 VIRAL POSTS")
         top = self.db.execute('''
             SELECT caption, impressions, likes, retweets, engagement_rate
-            FROM posts WHERE posted_at > datetime('now', '-7 days')
+            FROM posts WHERE posted_ts > ?
             ORDER BY impressions DESC LIMIT 5
-        ''').fetchall()
+        ''', (cutoff,)).fetchall()
         
         for i, (cap, imp, likes, rt, eng) in enumerate(top, 1):
             print(f"\n{i}. {cap[:55]}...")
             print(f"   👀 {imp:,} views | ❤️ {likes} | 🔄 {rt} | 📈 {eng:.2f}%")
         
+        # Last 7 days from the rollups: (key, avg engagement, avg views, measured posts)
+        def ranked(dim, limit=-1):
+            return self.db.execute('''
+                SELECT key, SUM(eng_sum) / SUM(measured) as avg_eng, 1.0 * SUM(impressions) / SUM(measured), SUM(measured)
+                FROM rollups WHERE dim = ? AND day >= ?
+                GROUP BY key HAVING SUM(measured) > 0 ORDER BY avg_eng DESC LIMIT ?
+            ''', (dim, since, limit)).fetchall()
+        
         # Best hours
         print(f"\n⏰ BEST POSTING HOURS")
-        hours = self.db.execute('''
-            SELECT posted_hour, AVG(engagement_rate) as avg_eng, AVG(impressions) as avg_views
-            FROM posts WHERE posted_at > datetime('now', '-7 days') AND impressions > 0
-            GROUP BY posted_hour ORDER BY avg_eng DESC LIMIT 6
-        ''').fetchall()
-        
-        for hour, eng, views in hours:
-            print(f"  {hour:02d}:00 → {eng:.2f}% engagement | {views:,.0f} avg views")
+        for hour, eng, views, _ in ranked('hour', 6):
+            print(f"  {int(hour):02d}:00 → {eng:.2f}% engagement | {views:,.0f} avg views")
         
         # Best content type
         print(f"\n🎨 BEST CONTENT TYPE")
-        types = self.db.execute('''
-            SELECT source_type, AVG(engagement_rate) as avg_eng, AVG(impressions) as avg_views, COUNT(*) as cnt
-            FROM posts WHERE posted_at > datetime('now', '-7 days') AND impressions > 0
-            GROUP BY source_type ORDER BY avg_eng DESC
-        ''').fetchall()
-        
-        for ctype, eng, views, cnt in types:
+        for ctype, eng, views, cnt in ranked('content_type'):
             print(f"  {ctype}: {eng:.2f}% engagement | {views:,.0f} avg views ({cnt} posts)")
         
         # Best caption type
         print(f"\n💬 BEST CAPTION STYLE")
-        captions = self.db.execute('''
-            SELECT caption_type, AVG(engagement_rate) as avg_eng, COUNT(*) as cnt
-            FROM posts WHERE posted_at > datetime('now', '-7 days') AND impressions > 0
-            GROUP BY caption_type ORDER BY avg_eng DESC
-        ''').fetchall()
-        
-        for ctype, eng, cnt in captions:
-            print(f"  {ctype}: {eng:.2f}% engagement ({cnt} posts)")
+        for ctype, eng, _, cnt in ranked('caption_type'):
+            print(f"  {ctype or 'untagged'}: {eng:.2f}% engagement ({cnt} posts)")
         
         # 7-day trend
         print(f"\n📈 7-DAY GROWTH TREND")
+        days = {row[0]: row[1:] for row in self.db.execute('''
+            SELECT day, posts, impressions, likes, eng_sum FROM rollups WHERE dim = 'day' AND day >= ?
+        ''', (since,))}
         for i in range(6, -1, -1):
-            day = datetime.now() - timedelta(days=i)
-            day_str = day.strftime('%Y-%m-%d')
-            stats = self.db.execute('''
-                SELECT COUNT(*), SUM(impressions), SUM(likes), AVG(engagement_rate)
-                FROM posts WHERE DATE(posted_at) = ?
-            ''', (day_str,)).fetchone()
-            
-            posts, views, likes, eng = stats[0], stats[1] or 0, stats[2] or 0, stats[3] or 0
+            day = today - timedelta(days=i)
+            posts, views, likes, eng_sum = days.get(day.strftime('%Y-%m-%d'), (0, 0, 0, 0))
+            eng = eng_sum / posts if posts else 0
             print(f"  {day.strftime('%a %m/%d')}: {posts} posts | {views:,} views | {likes} ❤️ | {eng:.2f}% eng")
         
         print("\n" + "="*70)
@@ -138,3 +173,8 @@ if __name__ == '__main__':
     analytics.fetch_metrics()
     
     analytics.show_report()
+    
+    # One-shot run: keep its timings in the rolling history the bot writes to
+    days = json.load(open('config.json')).get('metrics_history_days', 7)
+    if days:
+        metrics.REGISTRY.record(analytics.db, days)
@@ -0,0 +1,406 @@
+import argparse, contextlib, hashlib, io, json, os, random, shutil, sys, tempfile, threading, time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit
+from bench_images import generate_corpus, percentile
+
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ROOT = Path(__file__).resolve().parent
+
+class VirtualClock:
+    """time-module stand-in whose sleep() only moves the clock forward"""
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.offset += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+# --- Local stand-in for Reddit, the quote APIs and image hosts ---------------
+
+class StandIn(ThreadingHTTPServer):
+    """Serves listing JSON (recorded fixtures or generated), bulk quotes and corpus images,
+    with ETags so conditional GETs get their 304s"""
+    daemon_threads = True
+
+    def __init__(self, images, fixtures=None, seed=7):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.images = images
+        self.fixtures = fixtures
+        self.rnd = random.Random(seed)
+        self.requests = self.not_modified = 0
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up mid-body (size caps, timeouts) are expected
+
+    def listing(self, path):
+        if self.fixtures:
+            recorded = Path(self.fixtures) / (path.strip('/').replace('/', '_'))
+            if recorded.exists():
+                return json.loads(recorded.read_text())
+        sub = path.split('/r/')[1].split('/')[0].split('.')[0]
+        rnd = random.Random(sub)
+        words = ['cat', 'monday', 'coffee', 'deadline', 'python', 'weekend', 'boss', 'gym', 'pizza', 'meeting']
+        return {'data': {'children': [{'data': {
+            'title': f"When the {rnd.choice(words)} meets the {rnd.choice(words)} {i}",
+            'url': f"https://i.redd.it/{sub}{i}.{['jpg', 'png', 'gif'][i % 3]}",
+            'score': 1000 - i, 'over_18': False,
+        }} for i in range(25)]}}
+
+    def quotes(self, path):
+        if path.startswith('/api/quotes'):
+            return [{'q': f"Bench wisdom number {i}.", 'a': 'Bench Author'} for i in range(50)]
+        return [{'content': f"Bench quote number {i}.", 'author': 'Bench Quoter'} for i in range(50)]
+
+    def image(self, path):
+        name = path.rsplit('/', 1)[-1]
+        return self.images[int(hashlib.md5(name.encode()).hexdigest(), 16) % len(self.images)]
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        path = self.path.split('?')[0]
+        if '/r/' in path:
+            body, kind = json.dumps(server.listing(path)).encode(), 'application/json'
+        elif 'quote' in path:
+            body, kind = json.dumps(server.quotes(path)).encode(), 'application/json'
+        else:
+            body, kind = server.image(path), 'application/octet-stream'
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', kind)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+def route_to(session, base):
+    """Send every request of a requests.Session to the stand-in, keeping path and query"""
+    from requests.adapters import HTTPAdapter
+
+    class LocalAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = base + parts.path + (f"?{parts.query}" if parts.query else '')
+            return super().send(request, **kwargs)
+
+    adapter = LocalAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+# --- Fake X API ----------------------------------------------------------------
+
+# endpoint -> requests per 15 minute window
+X_LIMITS = {'POST /2/tweets': 100, 'GET /2/tweets': 300, 'POST /1.1/media/upload.json': 415}
+
+class FakeX:
+    """Records calls, sleeps `latency` per call and answers with x-rate-limit-* headers
+    on the virtual clock; `error_rate` of calls fail with a 429"""
+
+    def __init__(self, clock, latency=0.02, error_rate=0.0, seed=7):
+        self.clock = clock
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows = {}  # endpoint -> (window start, used)
+        self.calls = {}
+        self.next_id = 10 ** 18
+
+    def call(self, session, method, url):
+        """Simulate one request: latency, window accounting, response hooks; raises on 429"""
+        import requests, tweepy
+        time.sleep(self.latency)
+        endpoint = f"{method} {urlsplit(url).path}"
+        now = self.clock.time()
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            start, used = self.windows.get(endpoint, (now, 0))
+            if now - start >= 900:
+                start, used = now, 0
+            limit = X_LIMITS.get(endpoint, 100)
+            limited = used >= limit or self.rnd.random() < self.error_rate
+            used += not limited
+            self.windows[endpoint] = (start, used)
+
+        response = requests.Response()
+        response.status_code = 429 if limited else 200
+        response.reason = 'Too Many Requests' if limited else 'OK'
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        response._content = b'{}'
+        response.headers.update({
+            'x-rate-limit-limit': str(limit),
+            'x-rate-limit-remaining': str(0 if limited else limit - used),
+            'x-rate-limit-reset': str(int(start + 900)),
+        })
+        for hook in session.hooks['response']:
+            hook(response)
+        if limited:
+            raise tweepy.TooManyRequests(response)
+
+    def tweet_id(self):
+        with self.lock:
+            self.next_id += 1
+            return str(self.next_id)
+
+class FakeResponse:
+    def __init__(self, data=None, errors=None):
+        self.data = data
+        self.errors = errors or []
+
+class FakeTweet:
+    def __init__(self, tweet_id, rnd):
+        impressions = rnd.randint(0, 5000)
+        self.id = int(tweet_id)
+        self.public_metrics = {'impression_count': impressions, 'like_count': rnd.randint(0, impressions // 20 + 1),
+                               'retweet_count': rnd.randint(0, 20), 'reply_count': rnd.randint(0, 10)}
+
+class FakeMedia:
+    def __init__(self, media_id):
+        self.media_id_string = media_id
+        self.expires_after_secs = 86400
+
+class FakeClient:
+    def __init__(self, x):
+        import requests
+        self.x = x
+        self.session = requests.Session()
+
+    def create_tweet(self, text=None, media_ids=None, **kwargs):
+        self.x.call(self.session, 'POST', 'https://api.twitter.com/2/tweets')
+        return FakeResponse({'id': self.x.tweet_id(), 'text': text})
+
+    def get_tweets(self, ids, **kwargs):
+        self.x.call(self.session, 'GET', 'https://api.twitter.com/2/tweets')
+        found = [FakeTweet(i, self.x.rnd) for i in ids if self.x.rnd.random() > 0.01]
+        missing = set(map(str, ids)) - {str(t.id) for t in found}
+        return FakeResponse(found, [{'resource_id': i, 'title': 'Not Found Error'} for i in missing])
+
+class FakeAPI:
+    def __init__(self, x):
+        import requests
+        self.x = x
+        self.session = requests.Session()
+
+    def media_upload(self, filename, **kwargs):
+        self.x.call(self.session, 'POST', 'https://upload.twitter.com/1.1/media/upload.json')
+        return FakeMedia(self.x.tweet_id())
+
+# --- Seeded databases ------------------------------------------------------------
+
+def seed_db(path, rows, days=365, seed=7):
+    """posts spread over `days` with metrics, plus matching rollups"""
+    import storage, rollups
+    rnd = random.Random(seed)
+    db = storage.connect(str(path))
+    now = int(time.time())
+    batch = []
+    for i in range(rows):
+        ts = now - rnd.randint(0, days * 86400)
+        impressions = rnd.randint(0, 5000)
+        likes, retweets, replies = rnd.randint(0, 100), rnd.randint(0, 20), rnd.randint(0, 10)
+        batch.append((str(10 ** 17 + i), f"{i:016x}", f"https://i.redd.it/seed{i}.jpg",
+                      rnd.choice(['meme', 'video', 'quote']), 'caption', f"template:{rnd.randint(0, 4)}",
+                      '#bench', rnd.choice(['base', 'trending', 'brand', 'trending+brand']),
+                      datetime.fromtimestamp(ts).isoformat(), ts, datetime.fromtimestamp(ts).hour,
+                      impressions, likes, retweets, replies,
+                      (likes + retweets + replies) / impressions * 100 if impressions else 0,
+                      ts + rnd.randint(0, 86400) if rnd.random() < 0.5 else None))
+        if len(batch) == 50000 or i == rows - 1:
+            db.executemany('''INSERT INTO posts (tweet_id, content_hash, source_url, content_type, caption, caption_type,
+                hashtags, hashtag_set, posted_at, posted_ts, posted_hour, impressions, likes, retweets, replies,
+                engagement_rate, metrics_checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', batch)
+            batch = []
+    rollups.rebuild(db)
+    db.commit()
+    db.close()
+
+def seeded_copy(rows, dest):
+    """Copy of the cached seed database with `rows` posts (built on first use)"""
+    seed = ROOT / 'bench' / 'seeds' / f"posts_{rows}.db"
+    if not seed.exists():
+        seed.parent.mkdir(parents=True, exist_ok=True)
+        print(f"🧪 Seeding {rows:,} posts into {seed}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_db(seed, rows)
+    shutil.copy(seed, dest)
+
+# --- Stages ----------------------------------------------------------------------
+
+def summarize(latencies, elapsed):
+    ms = [s * 1000 for s in latencies]
+    return {'n': len(ms), 'ops_per_sec': len(ms) / elapsed if elapsed else 0,
+            'p50_ms': percentile(ms, 50), 'p95_ms': percentile(ms, 95), 'p99_ms': percentile(ms, 99)}
+
+def timed(fn, n, quiet=True):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            fn()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - started)
+
+def bench_bot(args, config, base, x, clock):
+    """Scrape, download/optimize and end-to-end posting against the stand-in and fake X"""
+    import tweepy, main, ratelimit
+    tweepy.Client = lambda *a, **k: FakeClient(x)
+    tweepy.API = lambda *a, **k: FakeAPI(x)
+    main.time = ratelimit.time = clock
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = main.JVWBot(config)
+    route_to(bot.http.session, base)
+    bot._pick_content_type = bot.prefetcher.pick_type = lambda: random.choice(['meme', 'meme', 'quote'])
+    bot.prefetcher.idle_seconds = 0.5  # the idle wait is wall time, not a rate-limit sleep
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.quotes.refill()
+
+    results = {}
+    results['scrape'] = timed(bot.scraper.get_random_content, args.scrapes)
+    urls = iter([f"https://i.redd.it/download{i}.jpg" for i in range(args.downloads)])
+    results['download_optimize'] = timed(lambda: bot._download_optimize(next(urls)), args.downloads)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.prefetcher.start()
+        bot.pipeline.start()
+    slept = clock.offset
+    results['post_content'] = timed(bot.post_content, args.posts)
+    results['post_content']['virtual_sleep_s'] = clock.offset - slept
+    for worker in (bot.prefetcher, bot.pipeline):
+        worker.stop()
+        worker._thread.join(timeout=60)
+    bot.image_engine.shutdown()
+    return results
+
+def bench_analytics(rows, x, runs):
+    """fetch_metrics and show_report over a seeded database of `rows` posts"""
+    import tweepy, analytics, ratelimit
+    tweepy.Client = lambda *a, **k: FakeClient(x)
+    ratelimit.time = x.clock
+    results = {}
+    fetch = []
+    for run in range(runs):
+        # a fresh copy per run in its own directory; fetch_metrics rewrites the rows it measures
+        workdir = Path(f"run{run}")
+        workdir.mkdir()
+        os.chdir(workdir)
+        seeded_copy(rows, 'bot.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            a = analytics.Analytics()
+        fetch.append(timed(a.fetch_metrics, 1)['p50_ms'] / 1000)
+        os.chdir('..')
+    os.chdir(workdir)
+    results[f'fetch_metrics@{rows}'] = summarize(fetch, sum(fetch))
+    results[f'show_report@{rows}'] = timed(a.show_report, runs * 3)
+    os.chdir('..')
+    return results
+
+# --- Baselines -------------------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    print(f"\n{'stage':<26}{'p50 now':>10}{'p50 base':>10}{'ops/s now':>11}{'ops/s base':>11}")
+    regressions = 0
+    for stage, r in results.items():
+        b = baseline.get(stage)
+        if not b:
+            print(f"{stage:<26}{r['p50_ms']:>10.1f}{'-':>10}{r['ops_per_sec']:>11.1f}{'-':>11}")
+            continue
+        slower = b['p50_ms'] and r['p50_ms'] > b['p50_ms'] * (1 + tolerance)
+        regressions += bool(slower)
+        print(f"{stage:<26}{r['p50_ms']:>10.1f}{b['p50_ms']:>10.1f}{r['ops_per_sec']:>11.1f}{b['ops_per_sec']:>11.1f}"
+              + ("  ⚠️ regression" if slower else ''))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark of the bot hot paths')
+    parser.add_argument('--rows', nargs='+', type=int, default=[10000, 100000], help='seeded posts for analytics')
+    parser.add_argument('--scrapes', type=int, default=50)
+    parser.add_argument('--downloads', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--analytics-runs', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=20, help='simulated X API latency')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='share of X calls answered with a 429')
+    parser.add_argument('--corpus', default='bench/e2e_corpus', help='images served by the stand-in (generated if empty)')
+    parser.add_argument('--fixtures', help='directory of recorded listing JSON (r_memes.json, ...)')
+    parser.add_argument('--save', metavar='NAME', help='save results as bench/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='NAME', help='compare against bench/baselines/NAME.json')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    for key in ('API_KEY', 'API_SECRET', 'ACCESS_TOKEN', 'ACCESS_SECRET', 'BEARER_TOKEN'):
+        os.environ.setdefault('X_' + key, 'bench')
+    corpus_dir = ROOT / args.corpus
+    if not corpus_dir.exists() or not any(corpus_dir.iterdir()):
+        print(f"🧪 Generating corpus in {corpus_dir}")
+        generate_corpus(corpus_dir, count=64)
+    images = [p.read_bytes() for p in sorted(corpus_dir.iterdir()) if p.is_file()]
+
+    config = json.loads((ROOT / 'config.json').read_text())
+    config.update(per_host_requests_per_second=1000, per_host_burst=1000)
+
+    server = StandIn(images, args.fixtures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    clock = VirtualClock()
+    x = FakeX(clock, latency=args.latency_ms / 1000, error_rate=args.error_rate)
+    print(f"🧪 Stand-in at {base} | {len(images)} images | X latency {args.latency_ms:.0f} ms, "
+          f"{args.error_rate:.0%} 429s\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            # analytics first: the bot's worker threads use paths relative to their directory
+            for rows in args.rows:
+                workdir = Path(tmp) / f"analytics_{rows}"
+                workdir.mkdir()
+                os.chdir(workdir)
+                results.update(bench_analytics(rows, x, args.analytics_runs))
+            os.chdir(tmp)
+            results.update(bench_bot(args, config, base, x, clock))
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'stage':<26}{'n':>6}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for stage, r in results.items():
+        print(f"{stage:<26}{r['n']:>6}{r['ops_per_sec']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+    sleep_s = results['post_content']['virtual_sleep_s']
+    print(f"\n🌐 Stand-in: {server.requests} requests, {server.not_modified} not modified | "
+          f"X calls: {x.calls} | virtual sleep {sleep_s:.0f}s")
+
+    baselines = ROOT / 'bench' / 'baselines'
+    if args.compare:
+        regressions = compare(results, json.loads((baselines / f"{args.compare}.json").read_text()), args.tolerance)
+        print(f"\n{'⚠️' if regressions else '✅'} {regressions} regressions against {args.compare}")
+    if args.save:
+        baselines.mkdir(parents=True, exist_ok=True)
+        (baselines / f"{args.save}.json").write_text(json.dumps(results, indent=2))
+        print(f"💾 Saved baseline {args.save}")
+    server.shutdown()
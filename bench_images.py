@@ -0,0 +1,70 @@
+import argparse, itertools, random, sys, tempfile, time
+from pathlib import Path
+from PIL import Image, ImageDraw
+from imageproc import ImageEngine, RESAMPLING
+
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+def generate_corpus(corpus_dir, count=24, seed=42):
+    """Deterministic mix of photo-like JPEGs and flat PNG/GIF memes at typical Reddit sizes"""
+    rnd = random.Random(seed)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    sizes = [(4032, 3024), (3000, 4000), (1920, 1080), (1080, 1350), (800, 800), (640, 480)]
+    for i in range(count):
+        w, h = sizes[i % len(sizes)]
+        img = Image.effect_noise((w, h), 40 + rnd.random() * 40).convert('RGB')
+        draw = ImageDraw.Draw(img)
+        for _ in range(30):
+            x, y = rnd.randrange(w), rnd.randrange(h)
+            draw.rectangle((x, y, x + rnd.randrange(w // 4), y + rnd.randrange(h // 4)),
+                           fill=(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+        fmt = ['JPEG', 'JPEG', 'PNG', 'GIF'][i % 4]
+        if fmt == 'GIF':
+            img = img.convert('P')
+        img.save(corpus_dir / f"img{i:03d}.{fmt.lower()}", fmt)
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def run(corpus, workers, resample, quality, out_dir):
+    engine = ImageEngine(workers=workers, resample=resample, quality=quality)
+    items = [(data, out_dir / f"{i}.jpg") for i, data in enumerate(corpus)]
+    engine.optimize_batch(items[:workers or 1])  # warm up the pool
+
+    started = time.perf_counter()
+    results = engine.optimize_batch(items)
+    elapsed = time.perf_counter() - started
+    engine.shutdown()
+
+    ok = [r for r in results if not isinstance(r, Exception)]
+    latencies = [stats['seconds'] * 1000 for _, stats in ok]
+    out_bytes = sum(dest.stat().st_size for _, dest in items if dest.exists())
+    return {
+        'images_per_sec': len(ok) / elapsed,
+        'p50_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95), 'p99_ms': percentile(latencies, 99),
+        'avg_kb': out_bytes / max(len(ok), 1) / 1024, 'failed': len(results) - len(ok),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark image optimization settings')
+    parser.add_argument('--corpus', default='bench/corpus', help='directory of images (generated if empty)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--resample', nargs='+', default=list(RESAMPLING))
+    parser.add_argument('--quality', nargs='+', type=int, default=[75, 85, 92])
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus)
+    if not corpus_dir.exists() or not any(corpus_dir.iterdir()):
+        print(f"🧪 Generating corpus in {corpus_dir}")
+        generate_corpus(corpus_dir)
+    corpus = [p.read_bytes() for p in sorted(corpus_dir.iterdir()) if p.is_file()]
+    print(f"🖼️ {len(corpus)} images, {sum(map(len, corpus))/1024/1024:.1f} MB | workers={args.workers}\n")
+
+    print(f"{'resample':<10}{'quality':>8}{'img/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'avg KB':>9}")
+    for resample, quality in itertools.product(args.resample, args.quality):
+        with tempfile.TemporaryDirectory() as tmp:
+            r = run(corpus, args.workers, resample, quality, Path(tmp))
+        print(f"{resample:<10}{quality:>8}{r['images_per_sec']:>9.1f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+              f"{r['p99_ms']:>9.0f}{r['avg_kb']:>9.0f}" + (f"  ({r['failed']} failed)" if r['failed'] else ''))
@@ -0,0 +1,71 @@
+import threading
+from phash import BKTree, from_hex
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Hosts that serve the same file regardless of query string (resize/signature params)
+STATIC_HOSTS = {'i.redd.it', 'i.imgur.com', 'imgur.com', 'media.giphy.com', 'images.unsplash.com', 'images.pexels.com', 'cdn.pixabay.com'}
+TRACKING_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'ref', 'ref_source', 'width', 'height'}
+
+def normalize_url(url):
+    """Canonical form of a media URL so reposts of the same file compare equal"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host == 'preview.redd.it':
+        host = 'i.redd.it'
+
+    if host in STATIC_HOSTS:
+        query = ''
+    else:
+        query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() not in TRACKING_PARAMS))
+
+    return urlunsplit(('https', host, parts.path.rstrip('/'), query, ''))
+
+class DedupeIndex:
+    """In-memory set of posted content hashes and source URLs, plus a BK-tree of
+    perceptual hashes for near-duplicates.
+
+    Loaded once from the account's rows of the posts table and kept in sync on
+    insert, so duplicate checks never hit SQLite and repeated URLs can be
+    rejected before download.
+    """
+
+    def __init__(self, db, max_distance=6, account='default'):
+        self.lock = threading.Lock()
+        self.hashes = set()
+        self.urls = set()
+        self.phashes = BKTree()
+        self.max_distance = max_distance
+        for content_hash, source_url, phash in db.execute('SELECT content_hash, source_url, phash FROM posts WHERE account = ?',
+                                                          (account,)):
+            self.add(content_hash, source_url, from_hex(phash) if phash else None)
+
+    def add(self, content_hash, source_url=None, phash=None):
+        with self.lock:
+            if content_hash:
+                self.hashes.add(content_hash)
+            if source_url and source_url != 'quote':
+                self.urls.add(normalize_url(source_url))
+            if phash is not None:
+                self.phashes.add(phash)
+
+    def add_url(self, source_url):
+        """Remember a URL whose content turned out to be already posted"""
+        self.add(None, source_url)
+
+    def seen_hash(self, content_hash):
+        return content_hash in self.hashes
+
+    def seen_similar(self, phash):
+        """Posted image within max_distance bits of phash, as (distance, hash), or None"""
+        if phash is None:
+            return None
+        with self.lock:
+            return self.phashes.find(phash, self.max_distance)
+
+    def seen_url(self, source_url):
+        return bool(source_url) and normalize_url(source_url) in self.urls
+
+    def __len__(self):
+        return len(self.hashes)
@@ -0,0 +1,149 @@
+import random, threading, time
+from collections import OrderedDict
+from urllib.parse import urlparse
+import metrics
+
+USER_AGENT = 'Mozilla/5.0'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class HostThrottle:
+    """Per-host token bucket so concurrent fetches stay polite to each host"""
+    def __init__(self, rate=1.0, burst=4):
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.buckets = {}  # host -> (tokens, last_refill)
+
+    def wait(self, url):
+        host = urlparse(url).netloc.lower()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                tokens, last = self.buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens >= 1:
+                    self.buckets[host] = (tokens - 1, now)
+                    return
+                self.buckets[host] = (tokens, now)
+                delay = (1 - tokens) / self.rate
+            time.sleep(delay)
+
+class HttpClient:
+    """One pooled keep-alive session for every outbound fetch.
+
+    Requests are throttled per host and retried with full-jitter exponential
+    backoff on connection errors and 429/5xx (honouring Retry-After).
+    get_json(conditional=True) revalidates with If-None-Match/If-Modified-Since
+    against a small LRU of parsed responses, so an unchanged listing costs a 304.
+    """
+
+    def __init__(self, pool_size=16, retries=3, backoff=0.5, max_backoff=30, cache_entries=64, throttle=None):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache_entries = cache_entries
+        self.throttle = throttle
+        self.cache = OrderedDict()  # url -> (etag, last_modified, data)
+        self.lock = threading.Lock()
+        self._session = None
+        self.requests = self.not_modified = self.retried = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            pool_size=config.get('http_pool_size', 16),
+            retries=config.get('http_retries', 3),
+            cache_entries=config.get('http_cache_entries', 64),
+            throttle=HostThrottle(
+                rate=config.get('per_host_requests_per_second', 1.0),
+                burst=config.get('per_host_burst', 4)
+            ),
+        )
+
+    @property
+    def session(self):
+        with self.lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.headers['User-Agent'] = USER_AGENT
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _delay(self, attempt, response=None):
+        retry_after = response is not None and response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, url, timeout=10, **kwargs):
+        """GET with throttling and retries; the last response (or error) is returned/raised as-is"""
+        import requests
+        host = urlparse(url).netloc.lower()
+        for attempt in range(self.retries + 1):
+            if self.throttle:
+                self.throttle.wait(url)
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                r = self.session.get(url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc('http_requests_total', host=host, status=type(e).__name__)
+                if attempt == self.retries:
+                    raise
+                self.retried += 1
+                metrics.inc('http_retries_total', host=host)
+                time.sleep(self._delay(attempt))
+                continue
+            # Streamed bodies are counted from Content-Length; the caller reads them later
+            metrics.observe('http_request_seconds', time.perf_counter() - start, host=host)
+            metrics.inc('http_requests_total', host=host, status=r.status_code)
+            size = r.headers.get('Content-Length') if kwargs.get('stream') else len(r.content)
+            metrics.inc('http_response_bytes_total', int(size or 0), host=host)
+            if r.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return r
+            r.close()
+            self.retried += 1
+            metrics.inc('http_retries_total', host=host)
+            time.sleep(self._delay(attempt, r))
+
+    def get_json(self, url, timeout=10, conditional=False):
+        """(data, changed); with conditional, a 304 returns the cached data and changed=False"""
+        headers = {}
+        cached = None
+        if conditional:
+            with self.lock:
+                cached = self.cache.get(url)
+            if cached:
+                etag, modified, _ = cached
+                if etag:
+                    headers['If-None-Match'] = etag
+                if modified:
+                    headers['If-Modified-Since'] = modified
+
+        r = self.get(url, timeout=timeout, headers=headers)
+        if r.status_code == 304 and cached:
+            self.not_modified += 1
+            with self.lock:
+                self.cache.move_to_end(url)
+            return cached[2], False
+        r.raise_for_status()
+        data = r.json()
+
+        etag, modified = r.headers.get('ETag'), r.headers.get('Last-Modified')
+        if conditional and (etag or modified):
+            with self.lock:
+                self.cache[url] = (etag, modified, data)
+                self.cache.move_to_end(url)
+                while len(self.cache) > self.cache_entries:
+                    self.cache.popitem(last=False)
+        return data, True
+
+    def stats(self):
+        return {'requests': self.requests, 'not_modified': self.not_modified, 'retried': self.retried,
+                'cached': len(self.cache)}
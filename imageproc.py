@@ -0,0 +1,99 @@
+import multiprocessing, os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from phash import dhash
+
+# Image.Resampling member names; PIL itself is imported on first use
+RESAMPLING = ('LANCZOS', 'BICUBIC', 'BILINEAR', 'BOX')
+
+def optimize_image(data, dest, max_side=2048, quality=85, resample='LANCZOS', max_pixels=24_000_000):
+    """Decode, downscale and JPEG-encode raw image bytes into dest; returns (phash, stats)"""
+    from PIL import Image
+    started = time.perf_counter()
+
+    # Image.open only parses the header, so bombs are rejected before decoding
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ValueError(f"image too many pixels ({width}x{height})")
+
+    # JPEGs decode straight at a reduced scale; palette/other modes need RGB before resampling
+    scale = min(max_side / width, max_side / height, 1)
+    img.draft('RGB', (int(width * scale), int(height * scale)))
+    decoded = img.size[0] * img.size[1] * len(img.getbands())
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGB')
+        decoded += img.size[0] * img.size[1] * 3
+    img.thumbnail((max_side, max_side), Image.Resampling[resample], reducing_gap=2.0)
+    img = img.convert('RGB')
+    # Write then rename so a crashed worker never leaves a half-written cache hit
+    tmp = f"{dest}.tmp"
+    img.save(tmp, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp, dest)
+
+    stats = {
+        'width': width, 'height': height, 'out_width': img.size[0], 'out_height': img.size[1],
+        'bytes_in': len(data), 'peak_bytes': len(data) + decoded,
+        'seconds': time.perf_counter() - started,
+    }
+    return dhash(img), stats
+
+class ImageEngine:
+    """Runs optimize_image in a process pool so CPU-bound PIL work stays off the bot's threads.
+
+    workers=0 (the default) runs everything inline. The bot optimizes one image
+    at a time and waits for it, so a single spawned worker adds no parallelism,
+    only a second interpreter (~60 MB RSS) on a 256 MB VM; use workers > 1 for
+    batch jobs on bigger machines.
+    """
+
+    def __init__(self, workers=0, max_side=2048, quality=85, resample='LANCZOS', max_pixels=24_000_000):
+        if resample not in RESAMPLING:
+            raise ValueError(f"unknown resample filter {resample!r}")
+        self.workers = workers
+        self.options = {'max_side': max_side, 'quality': quality, 'resample': resample, 'max_pixels': max_pixels}
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            workers=config.get('image_workers', 0),
+            max_side=config.get('image_max_side', 2048),
+            quality=config.get('image_quality', 85),
+            resample=config.get('image_resample', 'LANCZOS'),
+            max_pixels=config.get('max_image_pixels', 24_000_000),
+        )
+
+    @property
+    def pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: safe to start from a process that already runs threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def optimize(self, data, dest):
+        if not self.workers:
+            return optimize_image(data, str(dest), **self.options)
+        return self.pool.submit(optimize_image, data, str(dest), **self.options).result()
+
+    def optimize_batch(self, items):
+        """Optimize [(data, dest), ...] in parallel; results in input order, exceptions in place of failures"""
+        if not self.workers:
+            futures = None
+        else:
+            futures = [self.pool.submit(optimize_image, data, str(dest), **self.options) for data, dest in items]
+
+        results = []
+        for i, (data, dest) in enumerate(items):
+            try:
+                results.append(futures[i].result() if futures else optimize_image(data, str(dest), **self.options))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,85 @@
+import math, random
+
+class BanditLearner:
+    """Thompson-sampling learner over post attributes (hour, content type, caption
+    template, hashtag set), updated online as engagement metrics arrive.
+
+    Each arm keeps running count/mean/M2 (Welford) in the learner_arms table, so
+    an observation is a handful of constant-time upserts and a restart resumes
+    from those rows without scanning posts. A post's reward can change as its
+    metrics are refreshed; observe() swaps the old value for the new one.
+    """
+
+    DIMENSIONS = ('hour', 'content_type', 'caption_type', 'hashtag_set')
+
+    def __init__(self, db, prior_std=2.0):
+        self.db = db
+        self.prior_std = prior_std
+        self.arms = {}
+        self.load()
+
+    def load(self):
+        """(Re)read arm statistics, e.g. to pick up observations made by analytics.py"""
+        self.arms = {(dim, arm): [n, mean, m2] for dim, arm, n, mean, m2
+                     in self.db.execute('SELECT dim, arm, n, mean, m2 FROM learner_arms')}
+
+    def _update(self, dim, arm, old, new):
+        stats = self.arms.setdefault((dim, arm), [0, 0.0, 0.0])
+        n, mean, m2 = stats
+        if old is not None and n > 0:
+            if n == 1:
+                n, mean, m2 = 0, 0.0, 0.0
+            else:
+                old_mean = mean
+                mean = (n * mean - old) / (n - 1)
+                m2 = max(0.0, m2 - (old - mean) * (old - old_mean))
+                n -= 1
+        if new is not None:
+            n += 1
+            delta = new - mean
+            mean += delta / n
+            m2 += delta * (new - mean)
+        stats[:] = [n, mean, m2]
+        self.db.execute('''INSERT INTO learner_arms (dim, arm, n, mean, m2) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (dim, arm) DO UPDATE SET n = excluded.n, mean = excluded.mean, m2 = excluded.m2''',
+            (dim, arm, n, mean, m2))
+
+    def observe(self, attrs, old_reward, new_reward):
+        """Replace a post's counted reward (None = not counted) with new_reward; caller commits"""
+        if old_reward == new_reward:
+            return
+        for dim in self.DIMENSIONS:
+            if attrs.get(dim) is not None:
+                self._update(dim, str(attrs[dim]), old_reward, new_reward)
+
+    def _prior(self, dim):
+        n = sum(s[0] for (d, _), s in self.arms.items() if d == dim)
+        if not n:
+            return 0.0
+        return sum(s[0] * s[1] for (d, _), s in self.arms.items() if d == dim) / n
+
+    def _sample(self, dim, arm, prior):
+        n, mean, m2 = self.arms.get((dim, arm), (0, 0.0, 0.0))
+        if n == 0:
+            return random.gauss(prior, 2 * self.prior_std)
+        std = math.sqrt(m2 / (n - 1)) if n > 1 else self.prior_std
+        return random.gauss(mean, max(std, 0.1) / math.sqrt(n))
+
+    def choose(self, dim, options):
+        """Thompson sampling: the option whose posterior draw is highest"""
+        prior = self._prior(dim)
+        return max(options, key=lambda o: self._sample(dim, str(o), prior))
+
+    def rank(self, dim, options):
+        """Options ordered by one posterior draw each (best first)"""
+        prior = self._prior(dim)
+        draws = {o: self._sample(dim, str(o), prior) for o in options}
+        return sorted(options, key=draws.get, reverse=True)
+
+    def has_data(self, dim):
+        return any(s[0] for (d, _), s in self.arms.items() if d == dim)
+
+    @staticmethod
+    def reward(impressions, engagement_rate):
+        """Engagement rate once the post has impressions, else nothing to learn yet"""
+        return engagement_rate if impressions > 0 else None
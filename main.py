@@ -1,14 +1,25 @@
-import os, json, time, random, hashlib, sqlite3, sys, threading
+import os, json, time, random, hashlib, sys, threading
 from datetime import datetime, timedelta
 from pathlib import Path
-import requests
-from urllib.parse import urlparse
-from PIL import Image
 from io import BytesIO
-import tweepy
+from collections import OrderedDict
+from concurrent.futures import Future
 from dotenv import load_dotenv
 from scraper import ContentScraper
+from quotes import QuotePool, quote_hash
+from http_client import HttpClient
 from trends import TrendDetector
+from prefetch import ContentPrefetcher
+from pipeline import PostPipeline
+from dedupe import DedupeIndex
+from phash import dhash, to_hex
+from imageproc import ImageEngine
+from media_cache import MediaCache
+from video import download_video, mp4_duration, upload_video, upload_calls, processing_state
+import storage, rollups, metrics
+from learner import BanditLearner
+from scheduler import SlotScheduler
+from ratelimit import RateLimitGovernor, CREATE_TWEET, MEDIA_UPLOAD, MEDIA_STATUS
 
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -18,184 +29,440 @@ load_dotenv()
 def keep_alive():
     while True:
         time.sleep(600)
-        print("🔄 Keep-alive ping")
+        print(f"🔄 Keep-alive ping | RSS {metrics.rss_bytes()/1024/1024:.0f} MB | {threading.active_count()} threads")
 
-threading.Thread(target=keep_alive, daemon=True).start()
+CAPTION_TEMPLATES = {
+    'meme': ["Double tap if you agree 💯", "Tag someone 👇", "RT if this is you 🔄", "Facts or facts? 💭", "This hits different ✨"],
+    'video': ["Watch this 🎥", "This is powerful 💪", "Save this for later 💾", "You need to see this 👀", "Motivation incoming 🚀"],
+    'quote': ["Daily reminder 📌", "Words to live by ✨", "Think about this 💭", "Save this 🔖", "Needed this today 🎯"]
+}
+
+# hashtag_set arm -> (trending tags, add a brand tag)
+HASHTAG_SETS = {'base': (0, False), 'trending': (2, False), 'brand': (0, True), 'trending+brand': (2, True)}
+
+class SharedServices:
+    """Everything that doesn't depend on the X account: HTTP, scraping, trends and media.
+
+    One instance is shared by all accounts in a process (see multi.py), and
+    remembers prepared media by source URL so an item scraped for one account
+    is not downloaded and resized again for the next, even when several
+    accounts reach it at the same moment.
+    """
+    
+    def __init__(self, config, memo_size=500):
+        self.config = config
+        self.http = HttpClient.from_config(config)
+        self.media_cache = MediaCache('cache', storage.DB_PATH, config.get('media_cache_max_mb', 500) * 1024 * 1024)
+        self.image_engine = ImageEngine.from_config(config)
+        self.scraper = ContentScraper(config, self.http)
+        self.trend_detector = TrendDetector(ttl=config.get('trends_ttl_seconds', 3600),
+                                            half_life_hours=config.get('trends_half_life_hours', 6),
+                                            http=self.http)
+        self.scraper.title_listeners.append(self.trend_detector.observe_titles)
+        
+        self.memo = OrderedDict()  # source url -> (path, content_hash, phash)
+        self.memo_size = memo_size
+        self.memo_lock = threading.Lock()
+        self.inflight = {}  # source url -> Future of the preparation under way
+        metrics.collector(self._collect_metrics)
+    
+    def _collect_metrics(self):
+        c = self.media_cache.stats()
+        metrics.gauge('media_cache_bytes', c['bytes'])
+        metrics.gauge('media_cache_entries', c['entries'])
+        metrics.gauge('media_cache_hit_ratio', c['hit_rate'])
+        metrics.gauge('http_cached_responses', len(self.http.cache))
+        metrics.gauge('media_memo_entries', len(self.memo))
+    
+    def recall(self, url):
+        """Media already prepared from url, if it is still in the cache"""
+        with self.memo_lock:
+            prepared = self.memo.get(url)
+        if prepared and self.media_cache.get(Path(prepared[0]).name):
+            metrics.inc('media_memo_lookups_total', result='hit')
+            return prepared
+        metrics.inc('media_memo_lookups_total', result='miss')
+        return None
+    
+    def prepare(self, url, fn):
+        """recall(url), or fn() remembered; callers arriving while another prepares url wait for its result"""
+        with self.memo_lock:
+            future = self.inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self.inflight[url] = Future()
+        if not owner:
+            metrics.inc('media_memo_lookups_total', result='wait')
+            return future.result()
+        try:
+            prepared = self.recall(url) or self.remember(url, fn())
+            future.set_result(prepared)
+            return prepared
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.memo_lock:
+                del self.inflight[url]
+    
+    def remember(self, url, prepared):
+        with self.memo_lock:
+            self.memo[url] = prepared
+            self.memo.move_to_end(url)
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return prepared
 
 class JVWBot:
-    def __init__(self):
-        self.config = json.load(open('config.json'))
-        self.cache_dir = Path('cache')
-        self.cache_dir.mkdir(exist_ok=True)
-        self.db = self._init_db()
-        self.scraper = ContentScraper(self.config)
-        
-        auth = tweepy.OAuth1UserHandler(
-            os.getenv('X_API_KEY'),
-            os.getenv('X_API_SECRET'),
-            os.getenv('X_ACCESS_TOKEN'),
-            os.getenv('X_ACCESS_SECRET')
-        )
-        self.api_v1 = tweepy.API(auth)
-        self.client = tweepy.Client(
-            bearer_token=os.getenv('X_BEARER_TOKEN'),
-            consumer_key=os.getenv('X_API_KEY'),
-            consumer_secret=os.getenv('X_API_SECRET'),
-            access_token=os.getenv('X_ACCESS_TOKEN'),
-            access_token_secret=os.getenv('X_ACCESS_SECRET')
-        )
+    def __init__(self, config=None, account='default', env_prefix='X_', shared=None):
+        """One X account; config/shared default to config.json and services of its own"""
+        self.config = config or json.load(open('config.json'))
+        self.account = account
+        self.env_prefix = env_prefix
+        self.shared = shared or SharedServices(self.config)
+        self.db = storage.connect()
+        self.db_lock = threading.Lock()
+        self.dedupe = DedupeIndex(self.db, self.config.get('near_duplicate_distance', 6), account)
+        self.http = self.shared.http
+        self.media_cache = self.shared.media_cache
+        self.image_engine = self.shared.image_engine
+        self.scraper = self.shared.scraper
+        self.trend_detector = self.shared.trend_detector
+        self.quotes = QuotePool(self.http, self.config.get('quote_sources', []), storage.DB_PATH,
+                                low_water=self.config.get('quote_pool_low_water', 20),
+                                is_posted=self.dedupe.seen_hash, account=account)
         
+        # X clients (and tweepy itself) are built on first use; every response feeds the governor
+        self.governor = RateLimitGovernor(storage.DB_PATH, scope=None if account == 'default' else account)
+        self._api_v1 = None
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+        # Carry the cooldown across restarts instead of forgetting the last post
         self.post_count = 0
-        self.last_post_time = 0
-        self.trend_detector = TrendDetector()
+        self.last_post_time = self.db.execute('SELECT MAX(posted_ts) FROM posts WHERE account = ?',
+                                              (account,)).fetchone()[0] or 0
+        self.learner = BanditLearner(self.db)
         self._learn_from_analytics()
         
-    def _init_db(self):
-        db = sqlite3.connect('bot.db', check_same_thread=False)
-        db.execute('''CREATE TABLE IF NOT EXISTS posts (
-            id INTEGER PRIMARY KEY,
-            tweet_id TEXT,
-            content_hash TEXT UNIQUE,
-            source_url TEXT,
-            content_type TEXT,
-            caption TEXT,
-            caption_type TEXT,
-            hashtags TEXT,
-            posted_at TIMESTAMP,
-            posted_hour INTEGER,
-            impressions INTEGER DEFAULT 0,
-            likes INTEGER DEFAULT 0,
-            retweets INTEGER DEFAULT 0,
-            replies INTEGER DEFAULT 0,
-            engagement_rate REAL DEFAULT 0
-        )''')
-        db.commit()
-        return db
+        self.prefetcher = ContentPrefetcher(
+            self.scraper, self._prepare_candidate,
+            maxsize=self.config.get('prefetch_queue_size', 5),
+            listing_ttl=self.config.get('prefetch_listing_ttl_seconds', 600),
+            pick_type=self._pick_content_type,
+            quotes=self.quotes
+        )
+        self.pipeline = PostPipeline(
+            self.prefetcher.get, self._stage_candidate, self._is_stale, poll=self._poll_media,
+            maxsize=self.config.get('staged_posts', 2)
+        )
+        metrics.collector(self._collect_metrics)
+        self.scheduler = SlotScheduler(
+            self.config['posts_per_day'], lambda: self.config['best_hours'],
+            min_gap=self.config['min_interval_seconds'],
+            lead_time=self.config.get('slot_lead_seconds', 600),
+            peak_weight=self.config.get('peak_hour_weight', 3)
+        )
+        
+    def _env(self, name):
+        return os.getenv(self.env_prefix + name)
+    
+    @property
+    def api_v1(self):
+        with self._client_lock:
+            if self._api_v1 is None:
+                import tweepy
+                auth = tweepy.OAuth1UserHandler(
+                    self._env('API_KEY'),
+                    self._env('API_SECRET'),
+                    self._env('ACCESS_TOKEN'),
+                    self._env('ACCESS_SECRET')
+                )
+                self._api_v1 = tweepy.API(auth)
+                self.governor.attach(self._api_v1.session)
+            return self._api_v1
+    
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                import tweepy
+                self._client = tweepy.Client(
+                    bearer_token=self._env('BEARER_TOKEN'),
+                    consumer_key=self._env('API_KEY'),
+                    consumer_secret=self._env('API_SECRET'),
+                    access_token=self._env('ACCESS_TOKEN'),
+                    access_token_secret=self._env('ACCESS_SECRET')
+                )
+                self.governor.attach(self._client.session)
+            return self._client
     
     def _learn_from_analytics(self):
         if not self.config.get('learning_enabled'):
             return
         
-        rows = self.db.execute('''
-            SELECT posted_hour, AVG(engagement_rate) as avg_eng
-            FROM posts WHERE posted_at > datetime('now', '-7 days') AND impressions > 0
-            GROUP BY posted_hour ORDER BY avg_eng DESC LIMIT 6
-        ''').fetchall()
-        
-        if rows:
-            self.config['best_hours'] = [r[0] for r in rows]
+        # analytics.py updates the arm statistics as metrics arrive; just pick them up
+        self.learner.load()
+        if self.learner.has_data('hour'):
+            self.config['best_hours'] = sorted(self.learner.rank('hour', list(range(24)))[:6])
             print(f"📊 Learned best hours: {self.config['best_hours']}")
         
-        rows = self.db.execute('''
-            SELECT content_type, AVG(engagement_rate) as avg_eng, COUNT(*) as cnt
-            FROM posts WHERE posted_at > datetime('now', '-7 days') AND impressions > 0
-            GROUP BY content_type ORDER BY avg_eng DESC
-        ''').fetchall()
-        
-        if rows:
-            print(f"📊 Best content: {rows[0][0]} ({rows[0][1]:.2%} engagement)")
+        if self.learner.has_data('content_type'):
+            best = self.learner.rank('content_type', list(CAPTION_TEMPLATES))[0]
+            n, mean, _ = self.learner.arms.get(('content_type', best), (0, 0, 0))
+            print(f"📊 Best content: {best} ({mean:.2f}% engagement over {n} posts)")
+    
+    def _choose(self, dim, options):
+        if self.config.get('learning_enabled'):
+            return self.learner.choose(dim, options)
+        return random.choice(options)
+    
+    def _collect_metrics(self):
+        metrics.gauge('quote_pool_available', len(self.quotes), account=self.account)
+        metrics.gauge('prefetch_queue_depth', self.prefetcher.qsize(), account=self.account)
+        metrics.gauge('staged_posts_ready', self.pipeline.ready.qsize(), account=self.account)
+    
+    def _pick_content_type(self):
+        if self.config.get('learning_enabled') and self.learner.has_data('content_type'):
+            return self.learner.choose('content_type', list(CAPTION_TEMPLATES))
+        return self.scraper.pick_content_type()
     
     def _is_duplicate(self, content_hash):
         """Check if content was already posted (EVER)"""
-        cur = self.db.execute('SELECT 1 FROM posts WHERE content_hash=?', (content_hash,))
-        return cur.fetchone() is not None
+        return self.dedupe.seen_hash(content_hash)
+    
+    def _is_stale(self, candidate):
+        """Queued candidate that was posted (or near-duplicated) since it was prepared"""
+        return self._is_duplicate(candidate['content_hash']) or self.dedupe.seen_similar(candidate['phash']) is not None
     
     def _download_optimize(self, url):
-        r = requests.get(url, timeout=15, stream=True, headers={'User-Agent': 'Mozilla/5.0'})
-        r.raise_for_status()
+        max_bytes = self.config.get('max_download_bytes', 15 * 1024 * 1024)
         
-        # Hash actual image content (not URL)
-        img_data = r.content
-        content_hash = hashlib.sha256(img_data).hexdigest()[:16]
-        cache_path = self.cache_dir / f"{content_hash}.jpg"
+        start = time.perf_counter()
+        r = self.http.get(url, timeout=15, stream=True)
+        try:
+            r.raise_for_status()
+            length = int(r.headers.get('Content-Length') or 0)
+            if length > max_bytes:
+                raise ValueError(f"image too large ({length:,} bytes)")
+            
+            # Hash actual image content (not URL) while streaming, with a hard size cutoff
+            hasher = hashlib.sha256()
+            buf = BytesIO()
+            for chunk in r.iter_content(64 * 1024):
+                hasher.update(chunk)
+                buf.write(chunk)
+                if buf.tell() > max_bytes:
+                    raise ValueError(f"image too large (>{max_bytes:,} bytes)")
+        finally:
+            r.close()
+        metrics.observe('bot_stage_seconds', time.perf_counter() - start, stage='download')
+        metrics.inc('media_download_bytes_total', buf.tell(), content_type='image')
         
-        if cache_path.exists():
-            return str(cache_path), content_hash
+        content_hash = hasher.hexdigest()[:16]
+        name = f"{content_hash}.jpg"
         
-        img = Image.open(BytesIO(img_data)).convert('RGB')
-        img.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
-        img.save(cache_path, 'JPEG', quality=85, optimize=True)
+        cache_path = self.media_cache.get(name)
+        if cache_path:
+            from PIL import Image
+            with Image.open(cache_path) as img:
+                return str(cache_path), content_hash, dhash(img)
         
-        return str(cache_path), content_hash
+        cache_path = self.media_cache.path(name)
+        with metrics.timer('bot_stage_seconds', stage='optimize'):
+            phash, stats = self.image_engine.optimize(buf.getvalue(), cache_path)
+        metrics.gauge('image_peak_bytes', stats['peak_bytes'])
+        self.media_cache.put(name)
+        print(f"🖼️ {stats['width']}x{stats['height']} → {stats['out_width']}x{stats['out_height']} | "
+              f"{stats['bytes_in']/1024:,.0f} KB in | ~{stats['peak_bytes']/1024/1024:.1f} MB peak | {stats['seconds']:.2f}s")
+        return str(cache_path), content_hash, phash
     
-    def _generate_caption(self, content_type, extra_text=None):
-        templates = {
-            'meme': ["Double tap if you agree 💯", "Tag someone 👇", "RT if this is you 🔄", "Facts or facts? 💭", "This hits different ✨"],
-            'video': ["Watch this 🎥", "This is powerful 💪", "Save this for later 💾", "You need to see this 👀", "Motivation incoming 🚀"],
-            'quote': ["Daily reminder 📌", "Words to live by ✨", "Think about this 💭", "Save this 🔖", "Needed this today 🎯"]
-        }
+    def _download_video(self, url):
+        max_bytes = self.config.get('max_video_bytes', 64 * 1024 * 1024)
+        max_seconds = self.config.get('max_video_seconds', 140)
+        
+        with metrics.timer('bot_stage_seconds', stage='download_video'):
+            tmp, content_hash = download_video(self.http, url, self.media_cache.dir, max_bytes)
+        metrics.inc('media_download_bytes_total', os.path.getsize(tmp), content_type='video')
+        try:
+            duration = mp4_duration(tmp)
+            if duration > max_seconds:
+                raise ValueError(f"video too long ({duration:.0f}s)")
+        except Exception:
+            os.remove(tmp)
+            raise
         
-        caption = random.choice(templates.get(content_type, templates['meme']))
+        name = f"{content_hash}.mp4"
+        os.replace(tmp, self.media_cache.path(name))
+        path = self.media_cache.put(name)
+        print(f"🎬 Video {duration:.0f}s | {path.stat().st_size/1024/1024:.1f} MB")
+        return str(path), content_hash
+    
+    def _prepare_candidate(self, content_url, content_type, extra_text):
+        """Download/optimize and dedupe a scraped item; None if it was already posted"""
+        with metrics.timer('bot_stage_seconds', stage='prepare', content_type=content_type):
+            candidate = self._prepare(content_url, content_type, extra_text)
+        metrics.inc('candidates_total', content_type=content_type, result='ready' if candidate else 'skipped')
+        return candidate
+    
+    def _prepare(self, content_url, content_type, extra_text):
+        if content_type == 'quote':
+            img_path, phash = None, None
+            content_hash = quote_hash(extra_text)
+        else:
+            # Reject known URLs before transferring any bytes
+            if self.dedupe.seen_url(content_url):
+                return None
+            img_path, content_hash, phash = self._prepare_media(content_url, content_type)
+        
+        if self._is_duplicate(content_hash):
+            if content_url:
+                self.dedupe.add_url(content_url)
+            return None
+        
+        near = self.dedupe.seen_similar(phash)
+        if near:
+            print(f"⏭️ Skip near-duplicate {content_type} (distance {near[0]})")
+            self.dedupe.add_url(content_url)
+            return None
+        
+        return {'url': content_url, 'content_type': content_type, 'extra_text': extra_text,
+                'img_path': img_path, 'content_hash': content_hash, 'phash': phash}
+    
+    def _stage_candidate(self, candidate):
+        """Upload media and write the caption ahead of the publish slot"""
+        with metrics.timer('bot_stage_seconds', stage='media_upload', account=self.account):
+            return self._stage(candidate)
+    
+    def _prepare_media(self, url, content_type):
+        """(path, content_hash, phash) of url's media, shared with other accounts"""
+        if content_type == 'video':
+            return self.shared.prepare(url, lambda: self._download_video(url) + (None,))
+        return self.shared.prepare(url, lambda: self._download_optimize(url))
+    
+    def _upload(self, staged):
+        """Upload staged media; the shared cache may have evicted it (another account posted it
+        first), in which case it is prepared again instead of failing"""
+        for attempt in range(2):
+            if not os.path.exists(staged['img_path']):
+                print(f"♻️ Media for {staged['url']} was evicted - preparing it again")
+                staged['img_path'] = self._prepare_media(staged['url'], staged['content_type'])[0]
+            try:
+                if staged['content_type'] == 'video':
+                    self.governor.acquire(MEDIA_UPLOAD, upload_calls(staged['img_path']))
+                    return upload_video(self.api_v1, staged['img_path'])
+                self.governor.acquire(MEDIA_UPLOAD)
+                return self.api_v1.media_upload(staged['img_path'])
+            except FileNotFoundError:
+                if attempt:
+                    raise
+    
+    def _stage(self, candidate):
+        staged = dict(candidate, media_ids=None, expires_at=None, check_at=None)
+        if candidate['content_type'] != 'quote':
+            media = self._upload(staged)
+        if candidate['content_type'] == 'video':
+            state, check_after = processing_state(media)
+            if state == 'failed':
+                raise ValueError(f"video processing failed: {media.processing_info.get('error')}")
+            if state != 'succeeded':
+                staged['check_at'] = time.time() + check_after
+        
+        if candidate['content_type'] != 'quote':
+            staged['media_ids'] = [media.media_id_string]
+            staged['expires_at'] = time.time() + (getattr(media, 'expires_after_secs', None) or 86400)
+        
+        staged['caption'], staged['hashtags'], staged['caption_type'], staged['hashtag_set'] = \
+            self._generate_caption(candidate['content_type'], candidate['extra_text'])
+        return staged
+    
+    def _poll_media(self, staged):
+        """Check on media X is still processing; None if processing failed"""
+        self.governor.acquire(MEDIA_STATUS)
+        media = self.api_v1.get_media_upload_status(staged['media_ids'][0])
+        state, check_after = processing_state(media)
+        if state == 'failed':
+            print(f"❌ Video processing failed: {media.processing_info.get('error')}")
+            return None
+        staged['check_at'] = time.time() + check_after if state != 'succeeded' else None
+        return staged
+    
+    def _generate_caption(self, content_type, extra_text=None):
+        """Caption text and hashtags, plus the caption_type/hashtag_set arms the learner picked"""
+        templates = CAPTION_TEMPLATES.get(content_type, CAPTION_TEMPLATES['meme'])
         
         if extra_text:
             caption = extra_text[:200]
+            caption_type = 'source_text'
+        else:
+            index = self._choose('caption_type', [f'template:{i}' for i in range(len(templates))])
+            caption = templates[int(index.split(':')[1])]
+            caption_type = index
         
         emojis = ['🔥', '💪', '⚡', '🚀', '💡', '✨', '👀', '💯']
         if random.random() < 0.3:
             caption += ' ' + random.choice(emojis)
         
         # Use smart trending hashtags
+        hashtag_set = self._choose('hashtag_set', list(HASHTAG_SETS))
+        num_trending, brand = HASHTAG_SETS[hashtag_set]
         base_tags = self.config['hashtags'].get(content_type, self.config['hashtags']['general'])
-        tags = self.trend_detector.get_smart_hashtags(content_type, base_tags)
+        tags = self.trend_detector.get_smart_hashtags(content_type, base_tags, num_trending)
         
-        if random.random() < 0.4:
+        if brand:
             tags.append(random.choice(self.config['brand_tags']))
         
         hashtags = ' '.join(tags[:5])
         caption += '\n\n' + hashtags
         
-        return caption, hashtags
-    
-    def _rate_limit_check(self):
-        now = time.time()
-        elapsed = now - self.last_post_time
-        min_wait = 300  # Force 5 min minimum between posts
-        if elapsed < min_wait:
-            wait_time = min_wait - elapsed
-            print(f"⏳ Rate limit protection: waiting {wait_time:.0f}s")
-            time.sleep(wait_time)
+        return caption, hashtags, caption_type, hashtag_set
     
     def post_content(self):
         max_attempts = 5
         for attempt in range(max_attempts):
             try:
-                content_url, content_type, extra_text = self.scraper.get_random_content()
+                staged = self.pipeline.get()
+                if staged is None:
+                    print(f"⏭️ No post ready (attempt {attempt+1}/{max_attempts})")
+                    continue
                 
-                if content_type == 'quote':
-                    content_hash = hashlib.sha256(extra_text.encode()).hexdigest()[:16]
-                    if self._is_duplicate(content_hash):
-                        print(f"⏭️ Skip duplicate quote (attempt {attempt+1}/{max_attempts})")
-                        continue
-                    
-                    caption, hashtags = self._generate_caption(content_type, extra_text)
-                    self._rate_limit_check()
-                    response = self.client.create_tweet(text=caption)
-                    tweet_id = response.data['id']
-                else:
-                    img_path, content_hash = self._download_optimize(content_url)
-                    if self._is_duplicate(content_hash):
-                        print(f"⏭️ Skip duplicate {content_type} (attempt {attempt+1}/{max_attempts})")
-                        continue
-                    
-                    media = self.api_v1.media_upload(img_path)
-                    caption, hashtags = self._generate_caption(content_type, extra_text)
-                    self._rate_limit_check()
-                    response = self.client.create_tweet(text=caption, media_ids=[media.media_id_string])
-                    tweet_id = response.data['id']
+                content_url = staged['url']
+                content_type = staged['content_type']
+                content_hash = staged['content_hash']
+                caption, hashtags = staged['caption'], staged['hashtags']
+                
+                self.governor.acquire(CREATE_TWEET)
+                with metrics.timer('bot_stage_seconds', stage='create_tweet', account=self.account):
+                    if staged['media_ids']:
+                        response = self.client.create_tweet(text=caption, media_ids=staged['media_ids'])
+                    else:
+                        response = self.client.create_tweet(text=caption)
+                tweet_id = response.data['id']
             
-                posted_hour = datetime.now().hour
-                self.db.execute('''INSERT INTO posts 
-                    (tweet_id, content_hash, source_url, content_type, caption, hashtags, posted_at, posted_hour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                    (tweet_id, content_hash, content_url or 'quote', content_type, caption, hashtags, datetime.now().isoformat(), posted_hour))
-                self.db.commit()
+                posted = datetime.now()
+                with metrics.timer('bot_stage_seconds', stage='db_write', account=self.account), self.db_lock:
+                    self.db.execute('''INSERT INTO posts 
+                        (account, tweet_id, content_hash, source_url, content_type, caption, caption_type, hashtags, hashtag_set,
+                         posted_at, posted_ts, posted_hour, phash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                        (self.account, tweet_id, content_hash, content_url or 'quote', content_type, caption, staged['caption_type'],
+                         hashtags, staged['hashtag_set'],
+                         posted.isoformat(), int(posted.timestamp()), posted.hour,
+                         to_hex(staged['phash']) if staged['phash'] is not None else None))
+                    rollups.record_post(self.db, content_type, staged['caption_type'], posted.hour, int(posted.timestamp()))
+                    self.db.commit()
+                self.dedupe.add(content_hash, content_url, staged['phash'])
+                if staged['img_path']:
+                    self.media_cache.mark_posted(Path(staged['img_path']).name)
                 
                 self.last_post_time = time.time()
                 self.post_count += 1
+                metrics.inc('posts_total', account=self.account, content_type=content_type, result='posted')
                 print(f"✅ Posted {content_type} #{self.post_count}: {caption[:40]}... | ID: {tweet_id}")
                 return True
                 
             except Exception as e:
+                metrics.inc('posts_total', account=self.account, result='failed')
                 print(f"❌ Post attempt {attempt+1} failed: {e}")
                 if attempt == max_attempts - 1:
                     return False
@@ -204,44 +471,50 @@ class JVWBot:
         print(f"❌ Failed to find unique content after {max_attempts} attempts")
         return False
     
+    def _posts_today(self):
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        with self.db_lock:
+            return self.db.execute('SELECT COUNT(*) FROM posts WHERE account = ? AND posted_ts >= ?',
+                                   (self.account, int(midnight.timestamp()))).fetchone()[0]
+    
+    def _prepare_slot(self):
+        """Runs lead time before each slot: refresh trends/learning while the pipeline stages media"""
+        self.trend_detector.current()
+        if self.post_count and self.post_count % 10 == 0:
+            print("\n📊 LEARNING FROM ANALYTICS...")
+            self._learn_from_analytics()
+            c = self.media_cache.stats()
+            print(f"🗂️ Cache: {c['entries']} files, {c['bytes']/1024/1024:.0f}/{c['max_bytes']/1024/1024:.0f} MB | "
+                  f"{c['hit_rate']:.0%} hits | {c['evictions']} evicted")
+            h = self.http.stats()
+            print(f"🌐 HTTP: {h['requests']} requests | {h['not_modified']} not modified | {h['retried']} retried")
+        if self.pipeline.ready.empty():
+            print(f"⏳ Next slot has nothing staged yet ({self.prefetcher.qsize()} candidates prefetched)")
+    
     def run_forever(self):
-        print("🚀 JVW BOT STARTING - 24/7 VIRAL GROWTH MODE")
+        account = '' if self.account == 'default' else f" [{self.account}]"
+        print(f"🚀 JVW BOT STARTING - 24/7 VIRAL GROWTH MODE{account}")
         print(f"🎯 Target: {self.config['posts_per_day']} posts/day")
         print(f"📊 Learning: {'ON' if self.config['learning_enabled'] else 'OFF'}")
         print(f"🔥 Best hours: {self.config['best_hours']}")
-        print("\n⏳ Waiting 15 min for rate limit cooldown...\n")
-        time.sleep(900)  # Wait 15 min on startup
+        self.trend_detector.current()  # warms a stale/missing snapshot in the background
+        if len(self.quotes) < self.quotes.low_water:
+            self.quotes.refill_async()
+        self.prefetcher.start()
+        self.pipeline.start()
         
-        while True:
-            try:
-                current_hour = datetime.now().hour
-                
-                if current_hour in self.config['best_hours']:
-                    interval = random.randint(self.config['min_interval_seconds'], self.config['max_interval_seconds'])
-                    print(f"⚡ PEAK HOUR {current_hour} - High activity mode")
-                else:
-                    interval = random.randint(self.config['min_interval_seconds'], self.config['max_interval_seconds'])
-                    if random.random() < 0.25:
-                        print(f"💤 Off-peak hour {current_hour} - Skipping")
-                        time.sleep(interval)
-                        continue
-                
-                self.post_content()
-                
-                if self.post_count % 10 == 0 and self.post_count > 0:
-                    print("\n📊 LEARNING FROM ANALYTICS...")
-                    self._learn_from_analytics()
-                
-                print(f"⏰ Next post in {interval//60} min {interval%60} sec\n")
-                time.sleep(interval)
-                
-            except KeyboardInterrupt:
-                print("\n🛑 Bot stopped by user")
-                break
-            except Exception as e:
-                print(f"❌ Main loop error: {e}")
-                time.sleep(300)
+        cooldown = self.last_post_time + self.config['min_interval_seconds'] - time.time()
+        if cooldown > 0:
+            print(f"⏳ Last post {(time.time() - self.last_post_time)/60:.0f} min ago - {cooldown:.0f}s cooldown left")
+        
+        try:
+            self.scheduler.run(self.post_content, self._prepare_slot, done_today=self._posts_today(),
+                               last_post=lambda: self.last_post_time)
+        except KeyboardInterrupt:
+            print("\n🛑 Bot stopped by user")
 
 if __name__ == '__main__':
+    threading.Thread(target=keep_alive, daemon=True).start()
     bot = JVWBot()
+    metrics.start(bot.config)
     bot.run_forever()
@@ -0,0 +1,89 @@
+import threading, time
+import storage, metrics
+from pathlib import Path
+
+class MediaCache:
+    """Byte-budgeted media cache over cache/ with an LRU index in SQLite.
+
+    Posted items are evicted first, then the least recently used. Eviction
+    runs a few entries at a time on insert, so the directory is never walked
+    (except once, to adopt files written before the index existed).
+    """
+
+    def __init__(self, cache_dir='cache', db_path=storage.DB_PATH, max_bytes=500 * 1024 * 1024):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = storage.connect(db_path)
+
+        self.sizes = dict(self.db.execute('SELECT name, size FROM media_cache'))
+        if not self.sizes:
+            self._adopt_existing()
+        self.total_bytes = sum(self.sizes.values())
+        self.hits = self.misses = self.evictions = 0
+
+    def _adopt_existing(self):
+        rows = [(p.name, p.stat().st_size, int(p.stat().st_mtime)) for p in self.dir.iterdir()
+                if p.is_file() and p.suffix not in ('.tmp', '.part')]
+        if rows:
+            self.db.executemany('INSERT OR REPLACE INTO media_cache (name, size, last_access) VALUES (?, ?, ?)', rows)
+            self.db.commit()
+            self.sizes = {name: size for name, size, _ in rows}
+            print(f"🗂️ Indexed {len(rows)} cached files ({sum(self.sizes.values())/1024/1024:.0f} MB)")
+
+    def path(self, name):
+        return self.dir / name
+
+    def get(self, name):
+        """Path of a cached file (touching its LRU entry), or None"""
+        with self.lock:
+            if name not in self.sizes:
+                self.misses += 1
+                metrics.inc('media_cache_lookups_total', result='miss')
+                return None
+            self.hits += 1
+            metrics.inc('media_cache_lookups_total', result='hit')
+            self.db.execute('UPDATE media_cache SET last_access=? WHERE name=?', (int(time.time()), name))
+            self.db.commit()
+        return self.path(name)
+
+    def put(self, name):
+        """Register a file just written to path(name) and evict down to the budget"""
+        size = self.path(name).stat().st_size
+        with self.lock:
+            self.total_bytes += size - self.sizes.get(name, 0)
+            self.sizes[name] = size
+            self.db.execute('INSERT OR REPLACE INTO media_cache (name, size, last_access) VALUES (?, ?, ?)',
+                            (name, size, int(time.time())))
+            self._evict(keep=name)
+            self.db.commit()
+        return self.path(name)
+
+    def mark_posted(self, name):
+        with self.lock:
+            self.db.execute('UPDATE media_cache SET posted=1 WHERE name=?', (name,))
+            self.db.commit()
+
+    def _evict(self, keep):
+        while self.total_bytes > self.max_bytes:
+            victims = self.db.execute('''SELECT name, size FROM media_cache WHERE name != ?
+                ORDER BY posted DESC, last_access LIMIT 16''', (keep,)).fetchall()
+            if not victims:
+                return
+            for name, size in victims:
+                self.path(name).unlink(missing_ok=True)
+                self.db.execute('DELETE FROM media_cache WHERE name=?', (name,))
+                self.total_bytes -= self.sizes.pop(name, size)
+                self.evictions += 1
+                metrics.inc('media_cache_evictions_total')
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.sizes), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
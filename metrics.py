@@ -0,0 +1,200 @@
+import bisect, os, threading, time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import storage
+
+# Latency histogram bucket bounds in seconds (Prometheus 'le' labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escape = lambda v: v.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource, sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+class Metrics:
+    """Counters, gauges and latency histograms kept in process memory.
+
+    Updates are a dict lookup and an add under one lock, cheap enough to leave
+    on around every stage. Collectors registered with collector() refresh
+    gauges (cache sizes, queue depths, RSS) only when the metrics are read,
+    so the hot paths never pay for them.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.gauges = {}
+        self.histograms = {}  # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self.collectors = [self._process]
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            h[i] += 1
+            h[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the with-block, failed or not"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def collector(self, fn):
+        """Call fn() (which sets gauges) before every read of the metrics"""
+        self.collectors.append(fn)
+        return fn
+
+    def _process(self):
+        self.gauge('process_resident_memory_bytes', rss_bytes())
+        self.gauge('process_cpu_seconds_total', time.process_time())
+        self.gauge('process_threads', threading.active_count())
+
+    def _collect(self):
+        for fn in self.collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"❌ Metrics collector {getattr(fn, '__name__', fn)}: {e}")
+
+    def quantile(self, counts, q):
+        """Upper bucket bound holding the q-th observation of a histogram's counts"""
+        total = sum(counts[:-1])
+        if not total:
+            return 0.0
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts[:-1]):
+            seen += n
+            if seen >= q * total:
+                return bound
+        return float('inf')
+
+    def render(self):
+        """Prometheus text exposition format"""
+        self._collect()
+        with self.lock:
+            counters, gauges = dict(self.counters), dict(self.gauges)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+
+        lines = []
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                lines += [f"{name}{_format_labels(labels)} {value}"
+                          for (n, labels), value in sorted(values.items()) if n == name]
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), counts in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve render() at http://host:port/metrics from a daemon thread"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+    def record(self, db, retention_days=7):
+        """Append a snapshot to the metrics table (histograms as count, sum, p50, p95) and drop old rows"""
+        self._collect()
+        now = int(time.time())
+        with self.lock:
+            rows = [(now, name, _format_labels(labels), value)
+                    for values in (self.counters, self.gauges) for (name, labels), value in values.items()]
+            for (name, labels), counts in self.histograms.items():
+                labels = _format_labels(labels)
+                rows += [(now, f"{name}_count", labels, sum(counts[:-1])), (now, f"{name}_sum", labels, counts[-1]),
+                         (now, f"{name}_p50", labels, self.quantile(counts, 0.5)),
+                         (now, f"{name}_p95", labels, self.quantile(counts, 0.95))]
+        with db:
+            db.executemany('INSERT INTO metrics (ts, name, labels, value) VALUES (?, ?, ?, ?)', rows)
+            db.execute('DELETE FROM metrics WHERE ts < ?', (now - retention_days * 86400,))
+        return len(rows)
+
+# The process-wide registry every module reports into
+REGISTRY = Metrics()
+inc, gauge, observe, timer, collector = REGISTRY.inc, REGISTRY.gauge, REGISTRY.observe, REGISTRY.timer, REGISTRY.collector
+
+def start(config, db_path=storage.DB_PATH):
+    """Start the endpoint (metrics_port, 0 = off) and the rolling snapshot writer (metrics_history_days, 0 = off)"""
+    port = config.get('metrics_port', 9108)
+    if port:
+        try:
+            REGISTRY.serve(port)
+            print(f"📈 Metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"❌ Metrics endpoint on port {port}: {e}")
+
+    days = config.get('metrics_history_days', 7)
+    if days:
+        interval = config.get('metrics_snapshot_seconds', 300)
+        def write():
+            db = storage.connect(db_path)
+            while True:
+                time.sleep(interval)
+                try:
+                    REGISTRY.record(db, days)
+                except Exception as e:
+                    print(f"❌ Metrics snapshot: {e}")
+        threading.Thread(target=write, name='metrics-history', daemon=True).start()
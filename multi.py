@@ -0,0 +1,43 @@
+import json, threading
+from main import JVWBot, SharedServices, keep_alive
+import metrics
+
+# Settings an account entry in config.json may override
+ACCOUNT_KEYS = ('posts_per_day', 'min_interval_seconds', 'best_hours', 'hashtags', 'brand_tags', 'learning_enabled')
+
+class MultiAccountRunner:
+    """Hosts every account in config['accounts'] in one process.
+
+    Scraping, trends, media downloads/resizes and the media cache are shared
+    through one SharedServices; each account keeps its own credentials
+    (env vars under its env_prefix), schedule, rate-limit buckets, quote pool
+    and dedupe scope, and runs its scheduler on its own thread.
+    """
+
+    def __init__(self, config):
+        self.shared = SharedServices(config)
+        self.bots = []
+        for account in config.get('accounts') or [{'name': 'default', 'env_prefix': 'X_'}]:
+            account_config = dict(config, **{k: account[k] for k in ACCOUNT_KEYS if k in account})
+            self.bots.append(JVWBot(account_config, account['name'], account.get('env_prefix', 'X_'), self.shared))
+        print(f"👥 {len(self.bots)} accounts: {', '.join(bot.account for bot in self.bots)}")
+
+    def run_forever(self):
+        threads = [threading.Thread(target=bot.run_forever, name=f'account-{bot.account}', daemon=True)
+                   for bot in self.bots]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            for bot in self.bots:
+                bot.scheduler.stop()
+            print("\n🛑 Bots stopped by user")
+
+if __name__ == '__main__':
+    threading.Thread(target=keep_alive, daemon=True).start()
+    config = json.load(open('config.json'))
+    runner = MultiAccountRunner(config)
+    metrics.start(config)
+    runner.run_forever()
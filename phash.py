@@ -0,0 +1,64 @@
+def dhash(img, size=8):
+    """64-bit difference hash of a PIL image; survives recompression and resizing"""
+    from PIL import Image
+    gray = img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+    px = list(gray.getdata())
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (px[offset + col] > px[offset + col + 1])
+    return bits
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def to_hex(h):
+    return f"{h:016x}"
+
+def from_hex(s):
+    return int(s, 16)
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for near-duplicate lookups"""
+
+    def __init__(self):
+        self.root = None  # [hash, {distance: child}]
+        self.size = 0
+
+    def add(self, h):
+        if self.root is None:
+            self.root = [h, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [h, {}]
+                self.size += 1
+                return
+            node = child
+
+    def find(self, h, max_distance):
+        """Closest stored hash within max_distance as (distance, hash), or None"""
+        if self.root is None:
+            return None
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= max_distance and (best is None or d < best[0]):
+                best = (d, node[0])
+                if d == 0:
+                    break
+            lo, hi = d - max_distance, d + max_distance
+            stack.extend(child for dist, child in node[1].items() if lo <= dist <= hi)
+        return best
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,124 @@
+import queue, threading, time
+
+class PostPipeline:
+    """Staged posting: prepare -> upload media -> wait for slot -> publish.
+
+    Preparation is done by the prefetcher; this stage takes its candidates,
+    uploads their media and writes the caption ahead of time, so the slot
+    itself only pays for the create_tweet round-trip. `stage(candidate)`
+    returns the candidate extended with 'media_ids', 'caption', 'hashtags'
+    and 'expires_at' (when the uploaded media stops being usable);
+    `is_stale(candidate)` tells whether it was posted in the meantime.
+
+    Media that X still processes (video) is staged with 'check_at' set; it
+    is parked and `poll(staged)` is called whenever its check time comes,
+    returning it with a new 'check_at' (None once ready) or None if it
+    failed. Parked uploads never hold up staging of other candidates.
+    """
+
+    def __init__(self, next_candidate, stage, is_stale, poll=None, maxsize=2, expiry_margin=300):
+        self.next_candidate = next_candidate
+        self.stage = stage
+        self.is_stale = is_stale
+        self.poll = poll
+        self.ready = queue.Queue(maxsize=maxsize)
+        self.expiry_margin = expiry_margin
+        self.processing = []
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='pipeline', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _stage_next(self, timeout):
+        candidate = self.next_candidate(timeout=timeout)
+        if candidate is None or self.is_stale(candidate):
+            return None
+        return self.stage(candidate)
+
+    def _poll_processing(self):
+        if self.ready.full():
+            return
+        now = time.time()
+        for staged in [p for p in self.processing if p['check_at'] <= now]:
+            self.processing.remove(staged)
+            try:
+                staged = self.poll(staged)
+            except Exception as e:
+                print(f"❌ Media processing check failed: {e}")
+                continue
+            if staged is None:
+                continue
+            if staged['check_at'] or self.ready.full():
+                staged['check_at'] = staged['check_at'] or now
+                self.processing.append(staged)
+            else:
+                self._offer(staged)
+
+    def _offer(self, staged):
+        while not self._stop.is_set():
+            try:
+                self.ready.put(staged, timeout=5)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._poll_processing()
+            if self.ready.full():
+                self._stop.wait(1)
+                continue
+            try:
+                staged = self._stage_next(timeout=5 if self.processing else 30)
+            except Exception as e:
+                print(f"❌ Staging failed: {e}")
+                self._stop.wait(5)
+                continue
+
+            if staged is None:
+                continue
+            if staged.get('check_at'):
+                self.processing.append(staged)
+            else:
+                self._offer(staged)
+
+    def _usable(self, staged):
+        if staged['expires_at'] and staged['expires_at'] - time.time() < self.expiry_margin:
+            print(f"⏭️ Dropping staged {staged['content_type']}: media expired")
+            return False
+        if self.is_stale(staged):
+            print(f"⏭️ Dropping staged duplicate {staged['content_type']}")
+            return False
+        return True
+
+    def get(self, timeout=120):
+        """Next staged post whose media is still valid (stages inline when running without the thread)"""
+        deadline = time.time() + timeout
+        while True:
+            if self._thread is None:
+                staged = self._stage_next(timeout=timeout)
+                while staged is not None and staged.get('check_at'):
+                    time.sleep(max(0, staged['check_at'] - time.time()))
+                    staged = self.poll(staged)
+                if staged is None:
+                    return None
+            else:
+                try:
+                    staged = self.ready.get(timeout=max(0.1, deadline - time.time()))
+                except queue.Empty:
+                    return None
+            if self._usable(staged):
+                return staged
+            if time.time() >= deadline:
+                return None
+
+    def qsize(self):
+        return self.ready.qsize()
@@ -0,0 +1,111 @@
+import queue, threading, time
+from collections import OrderedDict
+
+class ContentPrefetcher:
+    """Keeps a bounded queue of ready-to-post candidates filled in the background.
+
+    `prepare(url, content_type, extra_text)` turns a raw scraper candidate into a
+    ready candidate dict (downloaded, optimized, hashed) or returns None if the
+    content was already posted.
+    """
+
+    def __init__(self, scraper, prepare, maxsize=5, listing_ttl=600, idle_seconds=30, pick_type=None, quotes=None):
+        self.scraper = scraper
+        self.prepare = prepare
+        self.pick_type = pick_type or scraper.pick_content_type
+        self.quotes = quotes  # per-account QuotePool; the scraper's own if None
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.listing_ttl = listing_ttl
+        self.idle_seconds = idle_seconds
+
+        self._pending = {}  # content_type -> (fetched_at, [raw candidates])
+        self._seen = OrderedDict()  # urls/quotes already tried this process
+        self._seen_max = 5000
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                candidate = self.produce_one()
+            except Exception as e:
+                print(f"❌ Prefetch error: {e}")
+                candidate = None
+
+            if candidate is None:
+                self._stop.wait(self.idle_seconds)
+                continue
+
+            while not self._stop.is_set():
+                try:
+                    self.queue.put(candidate, timeout=5)
+                    break
+                except queue.Full:
+                    pass
+
+    def _mark_seen(self, key):
+        if key in self._seen:
+            return False
+        self._seen[key] = True
+        if len(self._seen) > self._seen_max:
+            self._seen.popitem(last=False)
+        return True
+
+    def _next_raw(self, content_type):
+        """Next untried raw candidate, re-scraping the listing only when it is used up or stale"""
+        if content_type == 'quote':
+            # take() removes quotes from the pool, so never hold more than the one being prepared
+            for raw in self.scraper.get_candidates('quote', limit=1, quotes=self.quotes):
+                if self._mark_seen(raw[2]):
+                    return raw
+            return None
+        fetched_at, items = self._pending.get(content_type, (0, []))
+        if not items or time.time() - fetched_at > self.listing_ttl:
+            items = list(self.scraper.get_candidates(content_type, limit=10, quotes=self.quotes))
+            self._pending[content_type] = (time.time(), items)
+
+        while items:
+            raw = items.pop(0)
+            if self._mark_seen(raw[0] or raw[2]):
+                return raw
+        return None
+
+    def produce_one(self):
+        """Scrape, filter and prepare a single candidate"""
+        content_type = self.pick_type()
+        for _ in range(10):
+            raw = self._next_raw(content_type)
+            if raw is None:
+                return None
+            try:
+                candidate = self.prepare(*raw)
+            except Exception as e:
+                print(f"❌ Prefetch {raw[1]} failed: {e}")
+                continue
+            if candidate is not None:
+                return candidate
+        return None
+
+    def get(self, timeout=120):
+        """Pop the next ready candidate (prepares one inline when running without the thread)"""
+        if self._thread is None:
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                return self.produce_one()
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self.queue.qsize()
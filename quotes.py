@@ -0,0 +1,117 @@
+import hashlib, random, threading, time
+import storage
+
+# Seeded on first start so quote posts work before the first bulk fetch lands
+FALLBACK_QUOTES = [
+    "Success is not final, failure is not fatal. - Winston Churchill",
+    "The only way to do great work is to love what you do. - Steve Jobs",
+    "Innovation distinguishes between a leader and a follower. - Steve Jobs",
+    "The future belongs to those who believe in their dreams. - Eleanor Roosevelt",
+    "Don't watch the clock; do what it does. Keep going. - Sam Levenson"
+]
+
+def quote_hash(text):
+    """Content hash of a quote, as stored in posts.content_hash"""
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def parse_quotes(data):
+    """'text - author' strings from a zenquotes- or quotable-style response"""
+    items = data if isinstance(data, list) else data.get('results', [data])
+    quotes = []
+    for item in items:
+        text = item.get('q') or item.get('content')
+        author = item.get('a') or item.get('author') or 'Unknown'
+        # zenquotes reports its own rate limit as a "quote" by zenquotes.io
+        if text and author != 'zenquotes.io':
+            quotes.append(f"{text.strip()} - {author.strip()}")
+    return quotes
+
+class QuotePool:
+    """Unposted quotes kept in memory, backed by the quotes table.
+
+    The pool is loaded once with everything not yet posted, take() never
+    touches the network, and bulk endpoints are re-fetched in the background
+    whenever fewer than `low_water` quotes remain.
+    """
+
+    def __init__(self, http, sources, db_path=storage.DB_PATH, low_water=20, is_posted=None, retry_after=600,
+                 account='default'):
+        self.http = http
+        self.sources = sources
+        self.low_water = low_water
+        self.is_posted = is_posted or (lambda content_hash: False)
+        self.retry_after = retry_after
+        self.db = storage.connect(db_path)
+        self.lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = 0
+
+        self._store(FALLBACK_QUOTES, 'fallback')
+        self.available = self.db.execute('''SELECT hash, text FROM quotes
+            WHERE hash NOT IN (SELECT content_hash FROM posts WHERE account = ? AND content_hash IS NOT NULL)''',
+            (account,)).fetchall()
+        random.shuffle(self.available)
+        self.known = {h for h, in self.db.execute('SELECT hash FROM quotes')}
+
+    def _store(self, quotes, source):
+        rows = [(quote_hash(q), q, source, int(time.time())) for q in quotes]
+        with self.lock, self.db:
+            self.db.executemany('INSERT OR IGNORE INTO quotes (hash, text, source, added_at) VALUES (?, ?, ?, ?)', rows)
+
+    def refill(self):
+        """Fetch every bulk source and add quotes that are new to the pool (blocking)"""
+        added = 0
+        for source in self.sources:
+            try:
+                # A 304 still returns the cached body: the HttpClient is shared by every account's pool,
+                # so "unchanged" may only mean another pool already fetched it; known/is_posted filter
+                data, _ = self.http.get_json(source, conditional=True)
+            except Exception as e:
+                print(f"❌ Quote source {source}: {e}")
+                continue
+            with self.lock:
+                fresh = [(h, q) for h, q in ((quote_hash(q), q) for q in parse_quotes(data))
+                         if h not in self.known and not self.is_posted(h)]
+            if not fresh:
+                continue
+            self._store([q for _, q in fresh], source)
+            with self.lock:
+                self.known.update(h for h, _ in fresh)
+                self.available.extend(fresh)
+                random.shuffle(self.available)
+            added += len(fresh)
+        print(f"💬 Quote pool: +{added} new, {len(self.available)} available")
+        return added
+
+    def _refill(self):
+        try:
+            self.refill()
+        finally:
+            with self.lock:
+                self._refreshing = False
+
+    def refill_async(self):
+        with self.lock:
+            now = time.time()
+            if self._refreshing or now - self._last_attempt < self.retry_after:
+                return False
+            self._refreshing = True
+            self._last_attempt = now
+        threading.Thread(target=self._refill, name='quotes', daemon=True).start()
+        return True
+
+    def take(self, n=1):
+        """Up to n unposted quotes, without waiting on the network"""
+        taken = []
+        with self.lock:
+            while self.available and len(taken) < n:
+                content_hash, text = self.available.pop()
+                if not self.is_posted(content_hash):
+                    taken.append(text)
+            low = len(self.available) < self.low_water
+        if low:
+            self.refill_async()
+        return taken
+
+    def __len__(self):
+        return len(self.available)
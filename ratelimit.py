@@ -0,0 +1,111 @@
+import re, threading, time
+from urllib.parse import urlsplit
+import storage, metrics
+
+# Header prefix -> suffix of the bucket it feeds ('' = the endpoint's own 15 minute window)
+HEADER_BUCKETS = {
+    'x-rate-limit': '',
+    'x-user-limit-24hour': ' [user 24h]',
+    'x-app-limit-24hour': ' [app 24h]',
+}
+
+CREATE_TWEET = 'POST /2/tweets'
+GET_TWEETS = 'GET /2/tweets'
+MEDIA_UPLOAD = 'POST /1.1/media/upload.json'
+MEDIA_STATUS = 'GET /1.1/media/upload.json'
+
+def endpoint_key(method, url):
+    """'POST /2/tweets' style key; ids in the path are folded so every tweet shares a bucket"""
+    version, _, rest = urlsplit(url).path.lstrip('/').partition('/')
+    rest = re.sub(r'(^|/)\d+(?=/|$)', r'\1:id', rest)
+    return f"{method.upper()} /{version}/{rest}"
+
+class RateLimitGovernor:
+    """Per-endpoint X API budgets fed from the x-rate-limit-* response headers.
+
+    Each bucket holds what the API last reported (quota, remaining, reset) in
+    the rate_limits table, so main.py and analytics.py draw on the same budget.
+    acquire() takes a token before a call and sleeps until the window resets
+    when none are left; on_response() (a requests response hook on the tweepy
+    sessions) overwrites the bucket with the server's numbers after every call.
+    Endpoints that never reported limits are not throttled. Each account gets
+    its own buckets through `scope` (None keeps the unprefixed names).
+    """
+
+    def __init__(self, db_path=storage.DB_PATH, reserve=0, scope=None):
+        self.db = storage.connect(db_path)
+        self.scope = scope
+        self.reserve = reserve
+        self.lock = threading.Lock()
+
+    def attach(self, session):
+        """Feed every response of a requests.Session (tweepy's Client.session / API.session) into the governor"""
+        session.hooks['response'].append(self.on_response)
+        return session
+
+    def on_response(self, response, *args, **kwargs):
+        headers = response.headers
+        key = self._key(endpoint_key(response.request.method, response.url))
+        metrics.inc('x_api_responses_total', endpoint=key, status=response.status_code)
+        rows = []
+        for prefix, suffix in HEADER_BUCKETS.items():
+            try:
+                quota = int(headers[f'{prefix}-limit'])
+                remaining = int(headers[f'{prefix}-remaining'])
+                reset_at = int(headers[f'{prefix}-reset'])
+            except (KeyError, ValueError):
+                continue
+            if response.status_code == 429 and not suffix:
+                remaining = 0
+            rows.append((key + suffix, quota, remaining, reset_at, int(time.time())))
+        if rows:
+            with self.lock, self.db:
+                self.db.executemany('''INSERT OR REPLACE INTO rate_limits (endpoint, quota, remaining, reset_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)''', rows)
+        return response
+
+    def _key(self, endpoint):
+        return f"{self.scope}: {endpoint}" if self.scope else endpoint
+
+    def _take(self, endpoint, cost):
+        """Take cost tokens from every bucket of endpoint; returns 0 or the seconds to wait"""
+        endpoint = self._key(endpoint)
+        now = int(time.time())
+        with self.lock:
+            # BEGIN IMMEDIATE: the read-modify-write must not interleave with the other process
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                buckets = self.db.execute('''SELECT endpoint, quota, remaining, reset_at FROM rate_limits
+                    WHERE endpoint = ? OR endpoint LIKE ?''', (endpoint, endpoint + ' [%')).fetchall()
+                wait = 0
+                for name, quota, remaining, reset_at in buckets:
+                    if now >= reset_at:
+                        remaining = quota  # window rolled over since the last response
+                    if remaining - cost < self.reserve:
+                        wait = max(wait, reset_at - now + 1)
+                if not wait:
+                    self.db.executemany('''UPDATE rate_limits SET remaining = ? WHERE endpoint = ?''',
+                        [((quota if now >= reset_at else remaining) - cost, name)
+                         for name, quota, remaining, reset_at in buckets])
+                self.db.execute('COMMIT')
+            except:
+                self.db.execute('ROLLBACK')
+                raise
+        return wait
+
+    def acquire(self, endpoint, cost=1):
+        """Block until endpoint has cost calls left in all its windows, then reserve them"""
+        while True:
+            wait = self._take(endpoint, cost)
+            if not wait:
+                return
+            print(f"⏳ Rate limit on {endpoint}: waiting {wait}s for the window to reset")
+            metrics.inc('ratelimit_wait_seconds_total', wait, endpoint=self._key(endpoint))
+            time.sleep(wait)
+
+    def status(self):
+        """{endpoint: (remaining, quota, seconds to reset)}"""
+        now = int(time.time())
+        with self.lock:
+            return {name: (remaining, quota, max(0, reset_at - now)) for name, quota, remaining, reset_at
+                    in self.db.execute('SELECT endpoint, quota, remaining, reset_at FROM rate_limits')}
@@ -1,31 +1,21 @@
 import sqlite3, sys
+import storage
 
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
-db = sqlite3.connect('bot.db')
+# Schema changes are applied in place by storage.migrate on every start;
+# this script is only for wiping all history and starting over.
+db = sqlite3.connect(storage.DB_PATH)
 
-db.execute('DROP TABLE IF EXISTS posts')
-print("✅ Dropped old table")
-
-db.execute('''CREATE TABLE posts (
-    id INTEGER PRIMARY KEY,
-    tweet_id TEXT,
-    content_hash TEXT UNIQUE,
-    source_url TEXT,
-    content_type TEXT,
-    caption TEXT,
-    caption_type TEXT,
-    hashtags TEXT,
-    posted_at TIMESTAMP,
-    posted_hour INTEGER,
-    impressions INTEGER DEFAULT 0,
-    likes INTEGER DEFAULT 0,
-    retweets INTEGER DEFAULT 0,
-    replies INTEGER DEFAULT 0,
-    engagement_rate REAL DEFAULT 0
-)''')
+tables = [r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+for table in tables:
+    db.execute(f'DROP TABLE IF EXISTS {table}')
+db.execute('PRAGMA user_version = 0')
 db.commit()
 db.close()
+print(f"✅ Dropped {len(tables)} tables")
+
+storage.connect().close()
 
 print("✅ Database reset with new schema (memes, videos, quotes support)")
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+# Pre-aggregated report rows, one per (dimension, key, local day); 'total' keeps all-time sums.
+# measured = posts with impressions > 0, eng_sum = their summed engagement_rate, so averages
+# match the old AVG(...) WHERE impressions > 0 queries.
+DIMENSIONS = ('hour', 'content_type', 'caption_type', 'day', 'total')
+
+def create(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS rollups (
+        dim TEXT,
+        key TEXT,
+        day TEXT,
+        posts INTEGER DEFAULT 0,
+        impressions INTEGER DEFAULT 0,
+        likes INTEGER DEFAULT 0,
+        retweets INTEGER DEFAULT 0,
+        replies INTEGER DEFAULT 0,
+        eng_sum REAL DEFAULT 0,
+        measured INTEGER DEFAULT 0,
+        PRIMARY KEY (dim, key, day)
+    )''')
+
+def rebuild(db):
+    """Recompute every rollup row from the posts table"""
+    db.execute('DELETE FROM rollups')
+    day = "COALESCE(date(posted_ts, 'unixepoch', 'localtime'), '')"
+    sums = '''COUNT(*), SUM(impressions), SUM(likes), SUM(retweets), SUM(replies),
+        SUM(CASE WHEN impressions > 0 THEN engagement_rate ELSE 0 END), SUM(impressions > 0)'''
+    for dim, key, group_day in [
+        ('hour', "COALESCE(CAST(posted_hour AS TEXT), '')", day),
+        ('content_type', "COALESCE(content_type, '')", day),
+        ('caption_type', "COALESCE(caption_type, '')", day),
+        ('day', "''", day),
+        ('total', "''", "''"),
+    ]:
+        db.execute(f'''INSERT INTO rollups SELECT '{dim}', {key}, {group_day}, {sums}
+            FROM posts GROUP BY 2, 3''')
+
+def _keys(content_type, caption_type, posted_hour, posted_ts):
+    day = datetime.fromtimestamp(posted_ts).strftime('%Y-%m-%d')
+    return [
+        ('hour', str(posted_hour), day),
+        ('content_type', content_type or '', day),
+        ('caption_type', caption_type or '', day),
+        ('day', '', day),
+        ('total', '', ''),
+    ]
+
+def _apply(db, keys, posts=0, impressions=0, likes=0, retweets=0, replies=0, eng_sum=0.0, measured=0):
+    db.executemany('''INSERT INTO rollups (dim, key, day, posts, impressions, likes, retweets, replies, eng_sum, measured)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (dim, key, day) DO UPDATE SET
+            posts = posts + excluded.posts,
+            impressions = impressions + excluded.impressions,
+            likes = likes + excluded.likes,
+            retweets = retweets + excluded.retweets,
+            replies = replies + excluded.replies,
+            eng_sum = eng_sum + excluded.eng_sum,
+            measured = measured + excluded.measured''',
+        [k + (posts, impressions, likes, retweets, replies, eng_sum, measured) for k in keys])
+
+def record_post(db, content_type, caption_type, posted_hour, posted_ts):
+    """Count a new post; call inside the transaction that inserts it"""
+    _apply(db, _keys(content_type, caption_type, posted_hour, posted_ts), posts=1)
+
+def record_metrics(db, post, old, new):
+    """Apply the change from old to new (impressions, likes, retweets, replies, engagement_rate)
+    for post = (content_type, caption_type, posted_hour, posted_ts); call inside the metrics update"""
+    old_measured, new_measured = int(old[0] > 0), int(new[0] > 0)
+    _apply(db, _keys(*post),
+           impressions=new[0] - old[0], likes=new[1] - old[1], retweets=new[2] - old[2], replies=new[3] - old[3],
+           eng_sum=new[4] * new_measured - old[4] * old_measured, measured=new_measured - old_measured)
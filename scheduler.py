@@ -0,0 +1,138 @@
+import heapq, random, threading, time
+from datetime import datetime, timedelta
+
+class SlotScheduler:
+    """Plans the day's publish slots up front and wakes for each one.
+
+    The remaining posts of the day are spread over the rest of the day in
+    proportion to hour weights (best hours count `peak_weight` times), kept at
+    least `min_gap` apart. Slots sit in a heap next to their 'prepare' events
+    (`lead_time` earlier) and the midnight re-plan. A slot found more than
+    `late_grace` late (downtime, a slow post) or a failed publish re-plans the
+    rest of the day, so missed posts are moved rather than dropped.
+    """
+
+    def __init__(self, posts_per_day, best_hours, min_gap=300, lead_time=600, peak_weight=3.0,
+                 jitter=0.25, late_grace=None):
+        self.posts_per_day = posts_per_day
+        self.best_hours = best_hours  # callable, re-read on every plan
+        self.min_gap = min_gap
+        self.lead_time = lead_time
+        self.peak_weight = peak_weight
+        self.jitter = jitter
+        self.late_grace = late_grace if late_grace is not None else min_gap
+
+        self.heap = []
+        self.slots = []
+        self.done = 0
+        self._seq = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _push(self, ts, kind):
+        self._seq += 1
+        heapq.heappush(self.heap, (ts, self._seq, kind))
+
+    def _spans(self, start, end):
+        """(span start, span end, weight) per clock hour between start and end"""
+        peak = set(self.best_hours())
+        spans = []
+        t = start
+        while t < end:
+            hour = datetime.fromtimestamp(t)
+            next_hour = (hour.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)).timestamp()
+            spans.append((t, min(next_hour, end), self.peak_weight if hour.hour in peak else 1.0))
+            t = next_hour
+        return spans
+
+    def plan_slots(self, start, end, count):
+        """count timestamps in [start, end): weighted quantiles, jittered, min_gap apart"""
+        count = min(count, int((end - start) // self.min_gap) if self.min_gap else count)
+        if count <= 0:
+            return []
+        spans = self._spans(start, end)
+        total = sum((b - a) * w for a, b, w in spans)
+        slots = []
+        for i in range(count):
+            target = (i + 0.5 + random.uniform(-self.jitter, self.jitter)) / count * total
+            for a, b, w in spans:
+                if target <= (b - a) * w:
+                    slots.append(a + target / w)
+                    break
+                target -= (b - a) * w
+            else:
+                slots.append(end)
+
+        # Push forward to keep the gap, then back from the end of the window
+        slots.sort()
+        for i in range(1, count):
+            slots[i] = max(slots[i], slots[i - 1] + self.min_gap)
+        slots[-1] = min(slots[-1], end - 1)
+        for i in range(count - 2, -1, -1):
+            slots[i] = min(slots[i], slots[i + 1] - self.min_gap)
+        return slots
+
+    def plan(self, now=None, done_today=None, not_before=0):
+        """(Re)plan the rest of today; done_today = posts already published today"""
+        now = now or time.time()
+        if done_today is not None:
+            self.done = done_today
+        midnight = (datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+                    + timedelta(days=1)).timestamp()
+        start = max(now, not_before)
+        self.slots = self.plan_slots(start, midnight, self.posts_per_day - self.done) if start < midnight else []
+
+        self.heap = []
+        for slot in self.slots:
+            self._push(max(now, slot - self.lead_time), 'prepare')
+            self._push(slot, 'publish')
+        self._push(midnight, 'day')
+
+        if self.slots:
+            times = ', '.join(datetime.fromtimestamp(s).strftime('%H:%M') for s in self.slots[:8])
+            more = f" (+{len(self.slots) - 8} more)" if len(self.slots) > 8 else ''
+            print(f"🗓️ Planned {len(self.slots)} slots ({self.done}/{self.posts_per_day} done today): {times}{more}")
+        else:
+            print(f"🗓️ No slots left today ({self.done}/{self.posts_per_day} done)")
+        return self.slots
+
+    def next_slot(self):
+        return next((ts for ts, _, kind in sorted(self.heap) if kind == 'publish'), None)
+
+    def run(self, publish, prepare=None, done_today=0, last_post=None):
+        """Run until stop(); publish() returns True when a post went out.
+        last_post() gives the time of the latest post, for the minimum gap."""
+        last_post = last_post or (lambda: 0)
+        self.plan(done_today=done_today, not_before=last_post() + self.min_gap)
+        while not self._stop.is_set():
+            ts, _, kind = self.heap[0]
+            delay = ts - time.time()
+            if delay > 0:
+                # Short waits keep us honest across clock jumps and suspends
+                self._stop.wait(min(delay, 60))
+                continue
+            heapq.heappop(self.heap)
+            now = time.time()
+
+            if kind == 'day':
+                self.plan(now, done_today=0, not_before=last_post() + self.min_gap)
+            elif kind == 'prepare':
+                if prepare:
+                    try:
+                        prepare()
+                    except Exception as e:
+                        print(f"❌ Slot preparation failed: {e}")
+            elif now - ts > self.late_grace:
+                print(f"⏰ Missed slot {datetime.fromtimestamp(ts):%H:%M} by {(now - ts)/60:.0f} min - re-planning")
+                self.plan(now, not_before=last_post() + self.min_gap)
+            elif publish():
+                self.done += 1
+                following = self.next_slot()
+                if following:
+                    print(f"⏰ Next post at {datetime.fromtimestamp(following):%H:%M:%S} "
+                          f"({self.done}/{self.posts_per_day} today)\n")
+            else:
+                print("⚠️ Slot failed - re-planning the rest of the day")
+                self.plan(time.time(), not_before=last_post() + self.min_gap)
@@ -1,9 +1,13 @@
-import requests, json, random, time
+import json, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
+from http_client import HttpClient
+from quotes import QuotePool
+import metrics
 
 class ContentScraper:
-    def __init__(self, config):
+    def __init__(self, config, http=None, quotes=None):
         self.config = config
         self.memes_dir = Path('content/memes')
         self.videos_dir = Path('content/videos')
@@ -12,19 +16,59 @@ class ContentScraper:
         self.memes_dir.mkdir(parents=True, exist_ok=True)
         self.videos_dir.mkdir(parents=True, exist_ok=True)
         self.quotes_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.http = http or HttpClient.from_config(config)
+        self.quotes = quotes
+        # Listings fetched in the last few seconds are handed to every caller (one fetch for all accounts)
+        self.share_seconds = config.get('listing_share_seconds', 60)
+        self.recent = {}  # url -> (fetched_at, data)
+        self.recent_lock = threading.Lock()
+        self.title_listeners = []  # called with the titles of every fetched listing
+        self.pool = ThreadPoolExecutor(max_workers=config.get('scrape_workers', 8), thread_name_prefix='scrape')
     
     def _domain_allowed(self, url):
         host = urlparse(url).netloc.lower()
         return any(d in host for d in self.config['whitelist_domains'])
     
+    def _fetch_json(self, url):
+        """(data, changed); unchanged listings are revalidated with a conditional GET"""
+        with self.recent_lock:
+            fetched_at, data = self.recent.get(url, (0, None))
+        # monotonic() counts from boot, so a missing entry (fetched_at 0) must not pass as fresh
+        if data is not None and time.monotonic() - fetched_at < self.share_seconds:
+            return data, False
+        data, changed = self.http.get_json(url, conditional=True)
+        with self.recent_lock:
+            self.recent[url] = (time.monotonic(), data)
+        return data, changed
+    
+    def _fetch_listings(self, sources):
+        """Fetch all source listings concurrently, skipping the ones that fail"""
+        def fetch(source):
+            try:
+                return self._fetch_json(source)
+            except:
+                return None
+        
+        with metrics.timer('scrape_listings_seconds'):
+            results = [result for result in self.pool.map(fetch, sources) if result]
+        metrics.inc('scrape_listings_total', len(sources) - len(results), result='failed')
+        metrics.inc('scrape_listings_total', sum(changed for _, changed in results), result='changed')
+        metrics.inc('scrape_listings_total', sum(not changed for _, changed in results), result='unchanged')
+        listings = [data for data, _ in results]
+        if self.title_listeners:
+            # Only new listings: a 304 must not count the same titles twice
+            titles = [post['data'].get('title', '') for data, changed in results if changed
+                      for post in data.get('data', {}).get('children', [])]
+            for listener in self.title_listeners:
+                listener(titles)
+        return listings
+    
     def scrape_reddit_memes(self, limit=10):
         """Scrape memes from Reddit"""
         memes = []
-        for source in self.config.get('meme_sources', []):
+        for data in self._fetch_listings(self.config.get('meme_sources', [])):
             try:
-                r = requests.get(source, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-                data = r.json()
-                
                 for post in data['data']['children'][:limit]:
                     p = post['data']
                     if p.get('over_18'):
@@ -34,8 +78,6 @@ class ContentScraper:
                     if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif']):
                         if self._domain_allowed(url):
                             memes.append({'url': url, 'title': p.get('title', ''), 'score': p.get('score', 0)})
-                
-                time.sleep(2)
             except:
                 pass
         
@@ -44,11 +86,8 @@ class ContentScraper:
     def scrape_reddit_videos(self, limit=5):
         """Scrape videos from Reddit"""
         videos = []
-        for source in self.config.get('video_sources', []):
+        for data in self._fetch_listings(self.config.get('video_sources', [])):
             try:
-                r = requests.get(source, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-                data = r.json()
-                
                 for post in data['data']['children'][:limit]:
                     p = post['data']
                     if p.get('over_18') or p.get('is_video') != True:
@@ -58,55 +97,57 @@ class ContentScraper:
                         video_url = p['media'].get('reddit_video', {}).get('fallback_url')
                         if video_url:
                             videos.append({'url': video_url, 'title': p.get('title', ''), 'score': p.get('score', 0)})
-                
-                time.sleep(2)
             except:
                 pass
         
         return sorted(videos, key=lambda x: x['score'], reverse=True)[:limit]
     
+    def _quote_pool(self):
+        if self.quotes is None:
+            self.quotes = QuotePool(self.http, self.config.get('quote_sources', []),
+                                    low_water=self.config.get('quote_pool_low_water', 20))
+        return self.quotes
+    
     def get_random_quote(self):
-        """Get random motivational quote"""
-        try:
-            source = random.choice(self.config.get('quote_sources', []))
-            r = requests.get(source, timeout=10)
-            data = r.json()
-            
-            if 'zenquotes' in source:
-                return data[0]['q'] + ' - ' + data[0]['a']
-            else:
-                return data['content'] + ' - ' + data['author']
-        except:
-            # Fallback quotes
-            quotes = [
-                "Success is not final, failure is not fatal. - Winston Churchill",
-                "The only way to do great work is to love what you do. - Steve Jobs",
-                "Innovation distinguishes between a leader and a follower. - Steve Jobs",
-                "The future belongs to those who believe in their dreams. - Eleanor Roosevelt",
-                "Don't watch the clock; do what it does. Keep going. - Sam Levenson"
-            ]
-            return random.choice(quotes)
+        """Get random motivational quote from the local pool (None if it ran dry)"""
+        quotes = self._quote_pool().take()
+        return quotes[0] if quotes else None
     
-    def get_random_content(self):
-        """Get random content - meme, video, or quote"""
-        
-        # Decide content type (60% meme, 20% video, 20% quote)
+    def _fallback_image(self):
+        return f"https://picsum.photos/1920/1080?random={random.randint(1, 999999)}"
+    
+    def pick_content_type(self):
+        """Decide content type (60% meme, 20% video, 20% quote)"""
         rand = random.random()
-        
-        if rand < 0.6:  # Meme
-            memes = self.scrape_reddit_memes(5)
+        if rand < 0.6:
+            return 'meme'
+        elif rand < 0.8:
+            return 'video'
+        return 'quote'
+    
+    def get_candidates(self, content_type, limit=None, quotes=None):
+        """All current candidates for a content type as (url, content_type, extra_text)"""
+        with metrics.timer('scrape_candidates_seconds', content_type=content_type):
+            return self._candidates(content_type, limit, quotes)
+    
+    def _candidates(self, content_type, limit, quotes):
+        if content_type == 'meme':
+            memes = self.scrape_reddit_memes(limit or 5)
             if memes:
-                return memes[0]['url'], 'meme', None
+                return [(m['url'], 'meme', None) for m in memes]
             # Fallback to API image
-            return f"https://picsum.photos/1920/1080?random={random.randint(1, 999999)}", 'meme', None
+            return [(self._fallback_image(), 'meme', None)]
         
-        elif rand < 0.8:  # Video
-            videos = self.scrape_reddit_videos(3)
+        elif content_type == 'video':
+            videos = self.scrape_reddit_videos(limit or 3)
             if videos:
-                return videos[0]['url'], 'video', videos[0]['title']
+                return [(v['url'], 'video', v['title']) for v in videos]
             # Fallback to meme if no video
-            return f"https://picsum.photos/1920/1080?random={random.randint(1, 999999)}", 'meme', None
+            return [(self._fallback_image(), 'meme', None)]
         
         else:  # Quote
-            quote_text = self.get_random_quote()
-            return None, 'quote', quote_text
+            return [(None, 'quote', q) for q in (quotes if quotes is not None else self._quote_pool()).take(limit or 1)]
+    
+    def get_random_content(self):
+        """Get random content - meme, video, or quote"""
+        return self.get_candidates(self.pick_content_type())[0]
@@ -0,0 +1,181 @@
+import sqlite3
+import rollups
+
+DB_PATH = 'bot.db'
+
+def _v1_posts(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY,
+        tweet_id TEXT,
+        content_hash TEXT UNIQUE,
+        source_url TEXT,
+        content_type TEXT,
+        caption TEXT,
+        caption_type TEXT,
+        hashtags TEXT,
+        posted_at TIMESTAMP,
+        posted_hour INTEGER,
+        impressions INTEGER DEFAULT 0,
+        likes INTEGER DEFAULT 0,
+        retweets INTEGER DEFAULT 0,
+        replies INTEGER DEFAULT 0,
+        engagement_rate REAL DEFAULT 0
+    )''')
+
+def _add_columns(db, table, columns):
+    existing = {r[1] for r in db.execute(f'PRAGMA table_info({table})')}
+    for column, kind in columns:
+        if column not in existing:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+
+def _v2_dedupe_and_refresh_columns(db):
+    # Databases created by earlier builds may already have these
+    _add_columns(db, 'posts', [('phash', 'TEXT'), ('metrics_checked_at', 'REAL')])
+
+def _v3_epoch_timestamps(db):
+    _add_columns(db, 'posts', [('posted_ts', 'INTEGER')])
+    # posted_at holds naive local ISO strings; 'utc' converts local -> UTC before %s
+    db.execute("UPDATE posts SET posted_ts = CAST(strftime('%s', posted_at, 'utc') AS INTEGER) WHERE posted_ts IS NULL")
+
+def _v4_indexes(db):
+    # Covers the 7-day window scans and their GROUP BYs without touching the table
+    db.execute('''CREATE INDEX IF NOT EXISTS idx_posts_window ON posts
+        (posted_ts, impressions, posted_hour, content_type, caption_type, engagement_rate, likes, retweets)''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_posts_tweet ON posts (tweet_id)')
+
+def _v5_media_cache(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS media_cache (
+        name TEXT PRIMARY KEY,
+        size INTEGER,
+        last_access INTEGER,
+        posted INTEGER DEFAULT 0
+    )''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_media_cache_evict ON media_cache (posted DESC, last_access)')
+
+def _v6_rollups(db):
+    rollups.create(db)
+    db.execute('CREATE INDEX IF NOT EXISTS idx_rollups_window ON rollups (dim, day)')
+    rollups.rebuild(db)
+
+def _v7_learner(db):
+    _add_columns(db, 'posts', [('hashtag_set', 'TEXT'), ('learned_reward', 'REAL')])
+    db.execute('''CREATE TABLE IF NOT EXISTS learner_arms (
+        dim TEXT,
+        arm TEXT,
+        n INTEGER,
+        mean REAL,
+        m2 REAL,
+        PRIMARY KEY (dim, arm)
+    )''')
+    # Seed the learner once from history; afterwards it is only updated incrementally
+    db.execute('UPDATE posts SET learned_reward = engagement_rate WHERE impressions > 0')
+    for dim, column in [('hour', 'posted_hour'), ('content_type', 'content_type'), ('caption_type', 'caption_type')]:
+        db.execute(f'''INSERT OR REPLACE INTO learner_arms
+            SELECT '{dim}', CAST({column} AS TEXT), COUNT(*), AVG(learned_reward),
+                   MAX(0, SUM(learned_reward * learned_reward) - COUNT(*) * AVG(learned_reward) * AVG(learned_reward))
+            FROM posts WHERE learned_reward IS NOT NULL AND {column} IS NOT NULL GROUP BY {column}''')
+
+def _v8_rate_limits(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS rate_limits (
+        endpoint TEXT PRIMARY KEY,
+        quota INTEGER,
+        remaining INTEGER,
+        reset_at INTEGER,
+        updated_at INTEGER
+    )''')
+
+def _v9_quotes(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS quotes (
+        hash TEXT PRIMARY KEY,
+        text TEXT,
+        source TEXT,
+        added_at INTEGER
+    )''')
+
+POSTS_V10_COLUMNS = '''id, tweet_id, content_hash, source_url, content_type, caption, caption_type, hashtags,
+    posted_at, posted_hour, impressions, likes, retweets, replies, engagement_rate, phash, metrics_checked_at,
+    posted_ts, hashtag_set, learned_reward'''
+
+def _v10_accounts(db):
+    # Content is unique per account now; SQLite can't alter a UNIQUE constraint, so rebuild posts
+    db.execute('DROP TABLE IF EXISTS posts_v10')  # left behind by a build that predates atomic migrations
+    db.execute('''CREATE TABLE posts_v10 (
+        id INTEGER PRIMARY KEY,
+        account TEXT NOT NULL DEFAULT 'default',
+        tweet_id TEXT,
+        content_hash TEXT,
+        source_url TEXT,
+        content_type TEXT,
+        caption TEXT,
+        caption_type TEXT,
+        hashtags TEXT,
+        posted_at TIMESTAMP,
+        posted_hour INTEGER,
+        impressions INTEGER DEFAULT 0,
+        likes INTEGER DEFAULT 0,
+        retweets INTEGER DEFAULT 0,
+        replies INTEGER DEFAULT 0,
+        engagement_rate REAL DEFAULT 0,
+        phash TEXT,
+        metrics_checked_at REAL,
+        posted_ts INTEGER,
+        hashtag_set TEXT,
+        learned_reward REAL,
+        UNIQUE (account, content_hash)
+    )''')
+    db.execute(f'INSERT INTO posts_v10 ({POSTS_V10_COLUMNS}) SELECT {POSTS_V10_COLUMNS} FROM posts')
+    db.execute('DROP TABLE posts')
+    db.execute('ALTER TABLE posts_v10 RENAME TO posts')
+    _v4_indexes(db)
+    db.execute('CREATE INDEX IF NOT EXISTS idx_posts_account ON posts (account, posted_ts)')
+
+def _v11_metrics(db):
+    db.execute('''CREATE TABLE IF NOT EXISTS metrics (
+        ts INTEGER,
+        name TEXT,
+        labels TEXT,
+        value REAL
+    )''')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_metrics_name_ts ON metrics (name, ts)')
+
+# Append only: each entry runs once, in order, and bumps PRAGMA user_version
+MIGRATIONS = [
+    _v1_posts,
+    _v2_dedupe_and_refresh_columns,
+    _v3_epoch_timestamps,
+    _v4_indexes,
+    _v5_media_cache,
+    _v6_rollups,
+    _v7_learner,
+    _v8_rate_limits,
+    _v9_quotes,
+    _v10_accounts,
+    _v11_metrics,
+]
+
+def migrate(db):
+    while db.execute('PRAGMA user_version').fetchone()[0] < len(MIGRATIONS):
+        # Explicit transaction: sqlite3 doesn't open one before DDL, so `with db:` would leave
+        # a half-applied migration behind. IMMEDIATE also keeps two processes from racing.
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            number = db.execute('PRAGMA user_version').fetchone()[0] + 1
+            if number > len(MIGRATIONS):
+                db.execute('COMMIT')
+                return
+            migration = MIGRATIONS[number - 1]
+            migration(db)
+            db.execute(f'PRAGMA user_version = {number}')
+            db.execute('COMMIT')
+        except:
+            db.execute('ROLLBACK')
+            raise
+        print(f"🗄️ Migrated database to v{number} ({migration.__name__.split('_', 2)[2]})")
+
+def connect(path=DB_PATH):
+    """Open the bot database in WAL mode and bring its schema up to date"""
+    db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')  # main.py writes don't block analytics.py reads
+    db.execute('PRAGMA synchronous=NORMAL')
+    migrate(db)
+    return db
@@ -0,0 +1,138 @@
+import heapq, math, re, threading, time, zlib
+from array import array
+
+STOPWORDS = set('''
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each
+even ever every few first for from further get gets got had hadn't has hasn't have haven't having he he'd he'll
+he's her here here's hers herself him himself his how how's i i'd i'll i'm i've if in into is isn't it it's its
+itself just know last let's like made make many me more most much must mustn't my myself new no nor not now of
+off on once one only or other ought our ours ourselves out over own people really right said same say says see
+shan't she she'd she'll she's should shouldn't so some still such than that that's the their theirs them
+themselves then there there's these they they'd they'll they're they've thing things think this those though
+through time to today too two under until up upon us very via want was wasn't way we we'd we'll we're we've
+well went were weren't what what's when when's where where's which while who who's whom why why's will with
+won't would wouldn't year years yet you you'd you'll you're you've your yours yourself yourselves
+reddit subreddit post posts comment comments upvote anyone someone something everyone nothing guy guys
+til psa oc meirl irl
+'''.split())
+
+TOKEN = re.compile(r"[a-z][a-z0-9']*[a-z0-9]|[a-z]")
+
+def tokenize(title):
+    """Normalized unigrams and bigrams of a title, stopwords and short tokens dropped"""
+    words = [w.strip("'") for w in TOKEN.findall(title.lower())]
+    terms = []
+    prev = None
+    for w in words:
+        if len(w) < 3 or w in STOPWORDS:
+            prev = None
+            continue
+        terms.append(w)
+        if prev:
+            terms.append(f"{prev} {w}")
+        prev = w
+    return terms
+
+def to_hashtag(term):
+    words = term.split()
+    if len(words) == 1:
+        return '#' + words[0].replace("'", '')
+    return '#' + ''.join(w.replace("'", '').capitalize() for w in words)
+
+class CountMinSketch:
+    """Fixed-size Count-Min sketch of float counts (width x depth doubles)"""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array('d', bytes(8 * width * depth))
+
+    def _cells(self, item):
+        data = item.encode()
+        h1 = zlib.crc32(data)
+        h2 = zlib.adler32(data) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, weight):
+        """Add weight to item; returns its new estimate"""
+        estimate = math.inf
+        for cell in self._cells(item):
+            self.table[cell] += weight
+            estimate = min(estimate, self.table[cell])
+        return estimate
+
+    def estimate(self, item):
+        return min(self.table[cell] for cell in self._cells(item))
+
+    def scale(self, factor):
+        for i in range(len(self.table)):
+            self.table[i] *= factor
+
+class TrendEngine:
+    """Exponentially time-decayed term counts in a Count-Min sketch plus a top-k heap.
+
+    Instead of decaying every counter, new observations are weighted by
+    exp(t / tau); all stored values share that scale, so rankings stay valid
+    and true decayed counts are value * exp(-t / tau). Counters are rescaled
+    when the weight gets large. Memory is fixed by width, depth and k.
+    """
+
+    def __init__(self, half_life_hours=6, width=2048, depth=4, k=50):
+        self.tau = half_life_hours * 3600 / math.log(2)
+        self.sketch = CountMinSketch(width, depth)
+        self.k = k
+        self.top = {}   # term -> scaled estimate
+        self.heap = []  # (scaled estimate, term), may hold stale entries
+        self.origin = time.time()
+        self.lock = threading.Lock()
+
+    def _weight(self, now):
+        exponent = (now - self.origin) / self.tau
+        if exponent > 30:
+            # Rescale so weights stay well within float range
+            factor = math.exp(-exponent)
+            self.sketch.scale(factor)
+            self.top = {t: v * factor for t, v in self.top.items()}
+            self.heap = [(v, t) for t, v in self.top.items()]
+            heapq.heapify(self.heap)
+            self.origin = now
+            exponent = 0
+        return math.exp(exponent)
+
+    def _min_top(self):
+        while self.heap and self.top.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def _offer(self, term, estimate):
+        if term not in self.top and len(self.top) >= self.k:
+            smallest = self._min_top()
+            if smallest[0] >= estimate:
+                return
+            heapq.heappop(self.heap)
+            del self.top[smallest[1]]
+        self.top[term] = estimate
+        heapq.heappush(self.heap, (estimate, term))
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(v, t) for t, v in self.top.items()]
+            heapq.heapify(self.heap)
+
+    def observe(self, titles, now=None):
+        now = now or time.time()
+        with self.lock:
+            weight = self._weight(now)
+            for title in titles:
+                for term in set(tokenize(title)):
+                    self._offer(term, self.sketch.add(term, weight))
+
+    def top_terms(self, n=15, now=None):
+        """[(term, decayed count)] best first"""
+        now = now or time.time()
+        with self.lock:
+            decay = math.exp(-(now - self.origin) / self.tau)
+            ranked = sorted(self.top.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(term, value * decay) for term, value in ranked]
+
+    def hashtags(self, n=15, min_count=2.0):
+        return [to_hashtag(term) for term, count in self.top_terms(n) if count >= min_count]
@@ -1,55 +1,122 @@
-import requests
-import json
-from collections import Counter
+import json, os, random, threading, time
+from trend_engine import TrendEngine
+from http_client import HttpClient
+import metrics
+
+EVERGREEN_TRENDS = [
+    'motivation', 'success', 'mindset', 'entrepreneur',
+    'AI', 'tech', 'innovation', 'productivity', 'growth',
+    'funny', 'meme', 'viral', 'trending'
+]
 
 class TrendDetector:
-    def __init__(self):
+    """Trending hashtags from a decayed trend engine fed by r/all and every scrape.
+
+    r/all is re-read on a TTL in the background (stale trends are served
+    meanwhile), and the last good hashtags are kept on disk for cold starts.
+    """
+
+    def __init__(self, ttl=3600, retry_after=300, snapshot_path='trends_cache.json', half_life_hours=6, http=None):
+        self.http = http or HttpClient()
+        self.engine = TrendEngine(half_life_hours=half_life_hours)
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.snapshot_path = snapshot_path
         self.trending_hashtags = []
-    
+        self.fetched_at = 0
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = 0
+        self._load_snapshot()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self.trending_hashtags = snapshot['hashtags']
+            self.fetched_at = snapshot['fetched_at']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save_snapshot(self):
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'fetched_at': self.fetched_at, 'hashtags': self.trending_hashtags}, f)
+        os.replace(tmp, self.snapshot_path)
+
+    def _fetch_titles(self):
+        """New titles from r/all (none if unchanged since the last fetch); raises if Reddit can't be reached"""
+        data, changed = self.http.get_json('https://www.reddit.com/r/all/hot.json', conditional=True)
+        if not changed:
+            return []
+        return [post['data'].get('title', '') for post in data['data']['children']]
+
+    def observe_titles(self, titles):
+        """Feed titles from any scrape into the trend engine"""
+        self.engine.observe(titles)
+
+    def _ranked(self, n=15):
+        # Pad with evergreen topics until the engine has seen enough titles
+        tags = self.engine.hashtags(n)
+        tags += ['#' + t for t in EVERGREEN_TRENDS if '#' + t not in tags]
+        return tags[:n]
+
     def get_trending_hashtags(self):
-        """Get trending hashtags from multiple sources"""
-        trends = []
-        
-        # Method 1: Scrape from trending topics
+        """Get trending hashtags from multiple sources (blocking; prefer current())"""
         try:
-            # Reddit trending
-            r = requests.get('https://www.reddit.com/r/all/hot.json', 
-                           headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-            data = r.json()
-            
-            for post in data['data']['children'][:20]:
-                title = post['data'].get('title', '').lower()
-                # Extract hashtag-like words
-                words = [w for w in title.split() if len(w) > 4]
-                trends.extend(words[:3])
+            with metrics.timer('trends_refresh_seconds'):
+                self.observe_titles(self._fetch_titles())
+            fresh = True
         except:
-            pass
-        
-        # Method 2: Common trending topics
-        evergreen_trends = [
-            'motivation', 'success', 'mindset', 'entrepreneur', 
-            'AI', 'tech', 'innovation', 'productivity', 'growth',
-            'funny', 'meme', 'viral', 'trending'
-        ]
-        
-        # Combine and get most common
-        all_trends = trends + evergreen_trends
-        trend_counts = Counter(all_trends)
-        
-        self.trending_hashtags = ['#' + t for t, _ in trend_counts.most_common(15)]
+            fresh = False
+        metrics.inc('trends_refresh_total', result='ok' if fresh else 'failed')
+
+        # A failed fetch never replaces a good snapshot
+        if fresh or not self.trending_hashtags:
+            self.trending_hashtags = self._ranked()
+        if fresh:
+            self.fetched_at = time.time()
+            try:
+                self._save_snapshot()
+            except OSError as e:
+                print(f"❌ Could not save trends snapshot: {e}")
         return self.trending_hashtags
-    
-    def get_smart_hashtags(self, content_type, base_hashtags):
-        """Mix base hashtags with trending ones"""
-        if not self.trending_hashtags:
+
+    def _refresh(self):
+        try:
             self.get_trending_hashtags()
-        
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh_async(self, force=False):
+        """Start a background refresh unless one is running or the last attempt was too recent"""
+        with self._lock:
+            now = time.time()
+            if self._refreshing or (not force and now - self._last_attempt < self.retry_after):
+                return False
+            self._refreshing = True
+            self._last_attempt = now
+        threading.Thread(target=self._refresh, name='trends', daemon=True).start()
+        return True
+
+    def current(self):
+        """Current hashtags without ever waiting on the network"""
+        if time.time() - self.fetched_at > self.ttl:
+            self.refresh_async()
+        if self.engine.top:
+            return self._ranked()
+        return self.trending_hashtags or ['#' + t for t in EVERGREEN_TRENDS]
+
+    def get_smart_hashtags(self, content_type, base_hashtags, num_trending=2):
+        """Mix base hashtags with trending ones"""
+        trending = self.current()
+
         # 70% base hashtags, 30% trending
-        import random
         num_base = 3
-        num_trending = 2
-        
+
         selected = random.sample(base_hashtags, min(num_base, len(base_hashtags)))
-        selected += random.sample(self.trending_hashtags, min(num_trending, len(self.trending_hashtags)))
-        
+        selected += random.sample(trending, min(num_trending, len(trending)))
+
         return selected[:5]
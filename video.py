@@ -0,0 +1,117 @@
+import hashlib, os, struct, tempfile
+
+def _boxes(fp, start, end):
+    """Yield (type, payload_offset, payload_end) for the MP4 boxes between start and end"""
+    offset = start
+    while offset + 8 <= end:
+        fp.seek(offset)
+        header = fp.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header)
+        payload = offset + 8
+        if size == 1:
+            size = struct.unpack('>Q', fp.read(8))[0]
+            payload += 8
+        elif size == 0:
+            size = end - offset
+        if size < 8:
+            return
+        yield kind.decode('latin-1'), payload, offset + size
+        offset += size
+
+def _full_box_duration(fp, payload, time_field):
+    """(duration, timescale) from an mvhd box, or (duration, None) from an mehd box"""
+    fp.seek(payload)
+    version = fp.read(1)[0]
+    fp.seek(payload + 4)
+    if time_field:  # mvhd: creation/modification times, timescale, duration
+        if version == 1:
+            _, _, timescale, duration = struct.unpack('>QQIQ', fp.read(28))
+        else:
+            _, _, timescale, duration = struct.unpack('>IIII', fp.read(16))
+        return duration, timescale
+    fmt = '>Q' if version == 1 else '>I'
+    return struct.unpack(fmt, fp.read(struct.calcsize(fmt)))[0], None
+
+def mp4_duration(path):
+    """Duration in seconds read from the moov header (0 if unknown); never decodes media"""
+    end = os.path.getsize(path)
+    with open(path, 'rb') as fp:
+        for kind, payload, box_end in _boxes(fp, 0, end):
+            if kind != 'moov':
+                continue
+            duration, timescale = 0, 0
+            for child, child_payload, child_end in _boxes(fp, payload, box_end):
+                if child == 'mvhd':
+                    duration, timescale = _full_box_duration(fp, child_payload, True)
+                elif child == 'mvex' and not duration:
+                    # Fragmented MP4 (e.g. v.redd.it DASH): total length lives in mvex/mehd
+                    for sub, sub_payload, _ in _boxes(fp, child_payload, child_end):
+                        if sub == 'mehd':
+                            duration = _full_box_duration(fp, sub_payload, False)[0]
+            return duration / timescale if timescale else 0
+    raise ValueError("not an MP4 file (no moov box)")
+
+def download_video(http, url, dest_dir, max_bytes, timeout=30):
+    """Stream a video to dest_dir through the HttpClient without holding it in memory;
+    returns (temp_path, content_hash)"""
+    hasher = hashlib.sha256()
+    tmp = None
+    r = http.get(url, timeout=timeout, stream=True)
+    try:
+        r.raise_for_status()
+        length = int(r.headers.get('Content-Length') or 0)
+        if length > max_bytes:
+            raise ValueError(f"video too large ({length:,} bytes)")
+
+        # Unique name: concurrent downloads (other accounts, same URL) must not share a file
+        fd, tmp = tempfile.mkstemp(suffix='.part', dir=dest_dir)
+        written = 0
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in r.iter_content(256 * 1024):
+                hasher.update(chunk)
+                f.write(chunk)
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ValueError(f"video too large (>{max_bytes:,} bytes)")
+    except Exception:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        r.close()
+    return tmp, hasher.hexdigest()[:16]
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+def upload_calls(path, chunk_size=CHUNK_SIZE):
+    """Number of API requests upload_video makes for path (INIT + APPENDs + FINALIZE)"""
+    return 2 + -(-os.path.getsize(path) // chunk_size)
+
+def upload_video(api, path, media_category='tweet_video', chunk_size=CHUNK_SIZE):
+    """INIT/APPEND/FINALIZE upload reading one chunk at a time from disk.
+
+    Returns the finalized Media; if it has `processing_info` the caller polls
+    `api.get_media_upload_status` on its own schedule instead of sleeping here.
+    """
+    total = os.path.getsize(path)
+    media_id = api.chunked_upload_init(total, 'video/mp4', media_category=media_category).media_id
+    with open(path, 'rb') as f:
+        segment = 0
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            api.chunked_upload_append(media_id, (os.path.basename(path), chunk), segment)
+            segment += 1
+    return api.chunked_upload_finalize(media_id)
+
+def processing_state(media):
+    """(state, seconds until next check) from an upload response's processing_info"""
+    info = getattr(media, 'processing_info', None)
+    if not info:
+        return 'succeeded', 0
+    if 'error' in info:
+        return 'failed', 0
+    return info.get('state', 'succeeded'), info.get('check_after_secs', 5)